@@ -0,0 +1,81 @@
+import os
+import asyncio
+import hashlib
+import datetime
+import logging
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+from schemas.symbol_properties import SymbolProperties
+from services.ModelCache import ModelCache
+from services.SingleFlight import PropertiesKey
+from API.formats import JsonResponse, NegotiateFormat
+
+logger = logging.getLogger(__name__)
+
+# Janelas encerradas (end_date no passado) geram sempre a mesma resposta; janelas que incluem hoje mudam a cada barra
+RESPONSE_CACHE_HISTORICAL_TTL = float(os.getenv("RESPONSE_CACHE_HISTORICAL_TTL", "86400"))
+RESPONSE_CACHE_LIVE_TTL = float(os.getenv("RESPONSE_CACHE_LIVE_TTL", "60"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "4096"))
+
+_responseCache = ModelCache("responses", RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_LIVE_TTL, RESPONSE_CACHE_MAX_BYTES)
+
+def _Historical(props: SymbolProperties) -> bool:
+    # Datas fora do formato ISO são tratadas como janela em aberto (TTL curto)
+    try:
+        return datetime.date.fromisoformat(str(props.end_date)[:10]) < datetime.date.today()
+    except ValueError:
+        return False
+
+def _Key(request: Request, props: SymbolProperties) -> Hashable:
+    # Corpo normalizado + parâmetros (ordenados) + formato negociado pelo Accept
+    return (
+        request.url.path,
+        PropertiesKey(props),
+        tuple(sorted(request.query_params.multi_items())),
+        NegotiateFormat(request, None).value,
+    )
+
+def _Headers(etag: str, ttl: float) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": f"max-age={int(ttl)}", "Vary": "Accept"}
+
+def _Matches(request: Request, etag: str) -> bool:
+    # If-None-Match pode trazer vários ETags (ou *); ETags fracos (W/) também valem para GET condicional
+    tags = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    return etag in tags or "*" in tags
+
+def _Serve(request: Request, body: bytes, media_type: str, etag: str, ttl: float) -> Response:
+    if _Matches(request, etag):
+        return Response(status_code=304, headers=_Headers(etag, ttl))
+    return Response(content=body, media_type=media_type, headers=_Headers(etag, ttl))
+
+def CachedResponse(request: Request, props: SymbolProperties) -> Optional[Response]:
+    """
+    Resposta guardada para a mesma requisição (ou 304, se o cliente já tem o ETag), ou None.
+    """
+    entry = _responseCache.Get(_Key(request, props))
+    if entry is None:
+        return None
+    body, media_type, etag, ttl = entry
+    return _Serve(request, body, media_type, etag, ttl)
+
+def _Store(request: Request, props: SymbolProperties, result: Union[Dict[str, Any], Response]) -> Response:
+    if isinstance(result, StreamingResponse):
+        return result
+    response = JsonResponse(result)
+    body = bytes(response.body)
+    media_type = response.media_type
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    ttl = RESPONSE_CACHE_HISTORICAL_TTL if _Historical(props) else RESPONSE_CACHE_LIVE_TTL
+    _responseCache.Put(_Key(request, props), (body, media_type, etag, ttl), ttl, len(body))
+    return _Serve(request, body, media_type, etag, ttl)
+
+async def StoreResponse(request: Request, props: SymbolProperties,
+                        build: Callable[..., Union[Dict[str, Any], Response]], *args) -> Response:
+    """
+    Monta o corpo com build(*args) e o serializa em uma thread, fora do event loop; guarda no cache com TTL
+    conforme a janela e devolve com ETag. Respostas em streaming passam direto, pois guardá-las exigiria montar o
+    corpo inteiro em memória.
+    """
+    return await asyncio.to_thread(lambda: _Store(request, props, build(*args)))
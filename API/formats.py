@@ -0,0 +1,170 @@
+import io
+import os
+import asyncio
+import logging
+import orjson
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from entities.ResponseFormat import ResponseFormat
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    ResponseFormat.RECORDS: "application/json",
+    ResponseFormat.COLUMNS: "application/json",
+    ResponseFormat.ARROW: "application/vnd.apache.arrow.stream",
+    ResponseFormat.PARQUET: "application/vnd.apache.parquet",
+    ResponseFormat.NDJSON: "application/x-ndjson",
+}
+# Tipos aceitos no cabeçalho Accept quando o parâmetro format não é informado
+ACCEPT_FORMATS = {
+    "application/vnd.apache.arrow.stream": ResponseFormat.ARROW,
+    "application/vnd.apache.arrow.file": ResponseFormat.ARROW,
+    "application/vnd.apache.parquet": ResponseFormat.PARQUET,
+    "application/x-parquet": ResponseFormat.PARQUET,
+    "application/x-ndjson": ResponseFormat.NDJSON,
+}
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+# Barras por fatia nas respostas em streaming: a memória da serialização não cresce com o intervalo
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "5000"))
+
+def NegotiateFormat(request: Request, format: Optional[ResponseFormat]) -> ResponseFormat:
+    # O parâmetro format tem precedência; sem ele, o Accept escolhe Arrow/Parquet e o padrão continua records
+    if format is not None:
+        return format
+    accept = request.headers.get("accept", "")
+    for mediaType in (part.split(";")[0].strip().lower() for part in accept.split(",")):
+        if mediaType in ACCEPT_FORMATS:
+            return ACCEPT_FORMATS[mediaType]
+    return ResponseFormat.RECORDS
+
+def _Default(value: Any) -> Any:
+    # Tipos fora do suporte nativo do orjson (Timestamp, NaT, escalares NumPy)
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def _Column(series: pd.Series) -> Union[np.ndarray, list]:
+    # Arrays NumPy contíguos são serializados diretamente pelo orjson (NaN/inf viram null)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        if isinstance(series.dtype, pd.DatetimeTZDtype):
+            series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+        if series.isna().any():
+            # O orjson não representa NaT em datetime64: colunas com nulos viram lista de datetime/None
+            return [None if pd.isna(value) else value for value in series.dt.to_pydatetime()]
+        return np.ascontiguousarray(series.to_numpy(dtype="datetime64[ms]"))
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+        return np.ascontiguousarray(series.to_numpy())
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def _Columns(df: pd.DataFrame) -> Dict[str, Union[np.ndarray, list]]:
+    return {str(column): _Column(df[column]) for column in df.columns}
+
+def _Rows(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    # Mesmos valores de to_dict(orient="records"); NaN/inf viram null no orjson
+    names = [str(column) for column in df.columns]
+    columns = [df[column].tolist() for column in df.columns]
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+def _Dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_Default, option=ORJSON_OPTIONS)
+
+def _Slices(df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), STREAM_CHUNK_ROWS):
+        yield df.iloc[start:start + STREAM_CHUNK_ROWS]
+
+def _StreamNdjsonRows(df: pd.DataFrame, metadata: Dict[str, Any]) -> Iterator[bytes]:
+    # Primeira linha: metadados e colunas; depois uma linha por barra
+    yield _Dumps({**metadata, "columns": [str(column) for column in df.columns]}) + b"\n"
+    for chunk in _Slices(df):
+        yield b"".join(_Dumps(row) + b"\n" for row in _Rows(chunk))
+
+def _StreamNdjsonColumns(df: pd.DataFrame, metadata: Dict[str, Any]) -> Iterator[bytes]:
+    # Primeira linha: metadados; depois um objeto por coluna para cada fatia de barras
+    yield _Dumps(metadata) + b"\n"
+    for chunk in _Slices(df):
+        yield _Dumps(_Columns(chunk)) + b"\n"
+
+def _StreamRecords(df: pd.DataFrame, metadata: Dict[str, Any], key: str) -> Iterator[bytes]:
+    # Mesmo documento do formato records, enviado em partes: abertura, fatias do array e fechamento
+    head = _Dumps({**metadata, key: []})
+    yield head[:-2]
+    separator = b""
+    for chunk in _Slices(df):
+        rows = _Dumps(_Rows(chunk))
+        if len(rows) > 2:
+            yield separator + rows[1:-1]
+            separator = b","
+    yield b"]}"
+
+def _StreamArrow(df: pd.DataFrame, metadata: Dict[str, Any]) -> Iterator[bytes]:
+    # Arrow IPC stream: schema (inferido da primeira fatia) seguido de um record batch por fatia
+    schema = pa.Schema.from_pandas(df.iloc[:STREAM_CHUNK_ROWS], preserve_index=False)
+    schema = schema.with_metadata({**(schema.metadata or {}), b"metadata": _Dumps(metadata)})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in _Slices(df):
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+def FrameResponse(df: pd.DataFrame, format: ResponseFormat, metadata: Dict[str, Any],
+                  key: str = "data", stream: bool = False) -> Union[Dict[str, Any], Response]:
+    """
+    Serializa df (com o índice já como coluna) no formato pedido. records devolve o dicionário de sempre, que o
+    FastAPI converte; columns gera um JSON por coluna direto dos arrays NumPy; arrow e parquet levam os metadados
+    (symbol, fit, ...) no schema, na chave "metadata". Com stream (sempre em ndjson), a resposta é gerada em fatias
+    de STREAM_CHUNK_ROWS barras; parquet exige o rodapé do arquivo e é sempre enviado inteiro.
+    """
+    if format == ResponseFormat.NDJSON:
+        return StreamingResponse(_StreamNdjsonRows(df, metadata), media_type=MEDIA_TYPES[format])
+    if stream and format == ResponseFormat.RECORDS:
+        return StreamingResponse(_StreamRecords(df, metadata, key), media_type=MEDIA_TYPES[format])
+    if stream and format == ResponseFormat.COLUMNS:
+        return StreamingResponse(_StreamNdjsonColumns(df, metadata), media_type=MEDIA_TYPES[ResponseFormat.NDJSON])
+    if stream and format == ResponseFormat.ARROW:
+        return StreamingResponse(_StreamArrow(df, metadata), media_type=MEDIA_TYPES[format])
+
+    if format == ResponseFormat.RECORDS:
+        return {**metadata, key: df.replace([np.nan, np.inf, -np.inf], None).to_dict(orient="records")}
+
+    if format == ResponseFormat.COLUMNS:
+        return Response(content=_Dumps({**metadata, key: _Columns(df)}), media_type=MEDIA_TYPES[format])
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"metadata": _Dumps(metadata),
+    })
+    sink = io.BytesIO()
+    if format == ResponseFormat.ARROW:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+    return Response(content=sink.getvalue(), media_type=MEDIA_TYPES[format])
+
+def JsonResponse(content: Union[Dict[str, Any], Response]) -> Response:
+    # Corpos em dicionário (formato records) são serializados pelo orjson, muito mais rápido que o jsonable_encoder
+    if isinstance(content, Response):
+        return content
+    body = orjson.dumps(content, default=_Default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return Response(content=body, media_type=MEDIA_TYPES[ResponseFormat.RECORDS])
+
+async def BuildResponse(build: Callable[..., Union[Dict[str, Any], Response]], *args) -> Response:
+    """
+    Executa build(*args) e serializa o resultado em uma thread: o pós-processamento dos DataFrames (decimação,
+    replace, to_dict, Arrow/Parquet) e o JSON não bloqueiam o event loop enquanto as requisições leves esperam.
+    """
+    return await asyncio.to_thread(lambda: JsonResponse(build(*args)))
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from fastapi import Response
+from typing import Any, Dict, Union
+from schemas.symbol_properties import SymbolProperties
+from entities.ResponseFormat import ResponseFormat
+from entities.SelectionCriterion import SelectionCriterion
+from API.formats import FrameResponse
+
+# Corpo de cada endpoint de modelo, compartilhado entre a rota síncrona e o job assíncrono equivalente
+
+def _Cleaned(df: pd.DataFrame) -> pd.DataFrame:
+    return df.replace([np.nan, np.inf, -np.inf], None)
+
+def GarchLevelsBody(props: SymbolProperties, levels_df: pd.DataFrame, format: ResponseFormat = ResponseFormat.RECORDS,
+                    stream: bool = False) -> Union[Dict[str, Any], Response]:
+    # NaN vira null em JSON (records/columns) e permanece NaN em Arrow/Parquet
+    return FrameResponse(levels_df.reset_index(), format, {"symbol": props.symbol}, "garch_levels", stream)
+
+def GarchBestBody(props: SymbolProperties, criterion: SelectionCriterion,
+                  levels_df: pd.DataFrame, comparison: pd.DataFrame) -> Dict[str, Any]:
+    comparison_cleaned = _Cleaned(comparison)
+    return {
+        "symbol": props.symbol,
+        "criterion": criterion,
+        "best": {
+            "modelType": comparison_cleaned["modelType"].iloc[0],
+            "distribution": comparison_cleaned["distribution"].iloc[0]
+        },
+        "comparison": comparison_cleaned.to_dict(orient="records"),
+        "garch_levels": _Cleaned(levels_df).reset_index().to_dict(orient="records")
+    }
+
+def GarchForecastBody(props: SymbolProperties, forecast: pd.DataFrame, details: Dict[str, Union[str, int]]) -> Dict[str, Any]:
+    return {
+        "symbol": props.symbol,
+        **details,
+        "forecast": _Cleaned(forecast).to_dict(orient="records")
+    }
+
+def GarchBacktestBody(props: SymbolProperties, statistics: pd.DataFrame, summary: Dict[str, int]) -> Dict[str, Any]:
+    return {
+        "symbol": props.symbol,
+        "summary": summary,
+        "levels": _Cleaned(statistics).to_dict(orient="records")
+    }
+
+def MarkovRegimesBody(props: SymbolProperties, regimes: pd.DataFrame, format: ResponseFormat = ResponseFormat.RECORDS,
+                      stream: bool = False) -> Union[Dict[str, Any], Response]:
+    metadata = {"symbol": props.symbol, "fit": regimes.attrs.get("fit")}
+    return FrameResponse(regimes.reset_index(), format, metadata, "regimes", stream)
+
+def MarkovBestBody(props: SymbolProperties, criterion: SelectionCriterion,
+                   regimes: pd.DataFrame, comparison: pd.DataFrame) -> Dict[str, Any]:
+    comparison_cleaned = _Cleaned(comparison)
+    return {
+        "symbol": props.symbol,
+        "criterion": criterion,
+        "best": {
+            "n_regimes": int(comparison_cleaned["n_regimes"].iloc[0]),
+            "random_state": int(comparison_cleaned["random_state"].iloc[0])
+        },
+        "comparison": comparison_cleaned.to_dict(orient="records"),
+        "fit": regimes.attrs.get("fit"),
+        "regimes": regimes.reset_index().to_dict(orient="records")
+    }
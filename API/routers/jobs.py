@@ -0,0 +1,134 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, ValidationError
+from services.GarchLevels import GarchLevels
+from services.GarchBacktest import GarchBacktest
+from services.GarchForecast import GarchForecast
+from services.HiddenMarkovModel import HiddenMarkovModel
+from services.JobQueue import JobQueue, Job, JOB_WORKERS, JOB_MAX_QUEUED, JOB_RESULT_TTL, JOB_MAX_RETAINED
+from services.SingleFlight import PropertiesKey
+from API.formats import BuildResponse
+from API.responses import (GarchLevelsBody, GarchBestBody, GarchForecastBody, GarchBacktestBody,
+                           MarkovRegimesBody, MarkovBestBody)
+from schemas.symbol_properties import SymbolProperties
+from schemas.job_request import (JobRequest, GarchLevelsParams, GarchBestParams, GarchForecastParams,
+                                 GarchBacktestParams, MarkovRegimesParams, MarkovBestParams)
+from entities.JobKind import JobKind
+from entities.JobStatus import JobStatus
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type, Union
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+_jobs = JobQueue("model_jobs", JOB_WORKERS, JOB_MAX_QUEUED, JOB_RESULT_TTL, JOB_MAX_RETAINED)
+
+# Cada job produz o mesmo corpo JSON (formato records) do endpoint síncrono equivalente, montado fora do event loop
+async def _GarchLevels(props: SymbolProperties, params: GarchLevelsParams) -> Union[Dict[str, Any], str]:
+    result = await GarchLevels.GetLevelsAsync(props, params.modelType, params.distribution, params.levels,
+                                              params.step, params.multipliers)
+    if isinstance(result, str):
+        return result
+    return await asyncio.to_thread(GarchLevelsBody, props, result)
+
+async def _GarchBest(props: SymbolProperties, params: GarchBestParams) -> Union[Dict[str, Any], str]:
+    result = await GarchLevels.GetBestLevelsAsync(props, params.levels, params.criterion, params.step, params.multipliers)
+    if isinstance(result, str):
+        return result
+    return await asyncio.to_thread(GarchBestBody, props, params.criterion, *result)
+
+async def _GarchForecast(props: SymbolProperties, params: GarchForecastParams) -> Union[Dict[str, Any], str]:
+    result = await GarchForecast.ForecastAsync(props, params.modelType, params.distribution, params.horizon,
+                                               params.levels, params.step, params.multipliers, params.paths, params.seed)
+    if isinstance(result, str):
+        return result
+    return await asyncio.to_thread(GarchForecastBody, props, *result)
+
+async def _GarchBacktest(props: SymbolProperties, params: GarchBacktestParams) -> Union[Dict[str, Any], str]:
+    result = await GarchBacktest.BacktestAsync(props, params.modelType, params.distribution, params.levels,
+                                               params.step, params.multipliers, params.refitEvery,
+                                               params.trainWindow, params.minTrainBars)
+    if isinstance(result, str):
+        return result
+    return await asyncio.to_thread(GarchBacktestBody, props, *result)
+
+async def _MarkovRegimes(props: SymbolProperties, params: MarkovRegimesParams) -> Union[Dict[str, Any], str]:
+    result = await HiddenMarkovModel.GetRegimesAsync(props, params.n_regimes, params.features)
+    if isinstance(result, str):
+        return result
+    return await asyncio.to_thread(MarkovRegimesBody, props, result)
+
+async def _MarkovBest(props: SymbolProperties, params: MarkovBestParams) -> Union[Dict[str, Any], str]:
+    result = await HiddenMarkovModel.GetBestRegimesAsync(props, params.min_regimes, params.max_regimes,
+                                                         params.restarts, params.criterion, params.features)
+    if isinstance(result, str):
+        return result
+    return await asyncio.to_thread(MarkovBestBody, props, params.criterion, *result)
+
+_RUNNERS: Dict[JobKind, Tuple[Type[BaseModel], Callable[..., Awaitable[Union[Dict[str, Any], str]]]]] = {
+    JobKind.GARCH_LEVELS: (GarchLevelsParams, _GarchLevels),
+    JobKind.GARCH_LEVELS_BEST: (GarchBestParams, _GarchBest),
+    JobKind.GARCH_LEVELS_FORECAST: (GarchForecastParams, _GarchForecast),
+    JobKind.GARCH_LEVELS_BACKTEST: (GarchBacktestParams, _GarchBacktest),
+    JobKind.MARKOV_REGIMES: (MarkovRegimesParams, _MarkovRegimes),
+    JobKind.MARKOV_REGIMES_BEST: (MarkovBestParams, _MarkovBest),
+}
+
+def _JobStatus(job: Job) -> Dict[str, Any]:
+    status = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "priority": job.priority,
+        "queue_position": _jobs.QueuePosition(job),
+        # Fração das tarefas enviadas ao pool de processos que já terminaram
+        "progress": 1.0 if job.status == JobStatus.DONE else job.progress.Fraction(),
+        "tasks": {"completed": job.progress.completed, "submitted": job.progress.submitted},
+        "submitted_at": job.submittedAt,
+        "started_at": job.startedAt,
+        "finished_at": job.finishedAt
+    }
+    if job.status == JobStatus.FAILED:
+        status["error"] = job.error
+    if job.status == JobStatus.DONE:
+        status["result"] = job.result
+    return status
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Enfileira um ajuste de modelo (kind: garch_levels, garch_levels_best, garch_levels_forecast, garch_levels_backtest,
+    markov_regimes ou markov_regimes_best) com os mesmos parâmetros do endpoint síncrono em params, e retorna o id do
+    job. Jobs idênticos na fila ou em execução são deduplicados; priority maior sai da fila primeiro.
+    """
+    try:
+        schema, runner = _RUNNERS[request.kind]
+        try:
+            params = schema.model_validate(request.params)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=e.errors(include_url=False, include_context=False))
+
+        key = (request.kind.value, PropertiesKey(request.props), params.model_dump_json())
+        result = await _jobs.Submit(request.kind.value, key, request.priority, runner, request.props, params)
+
+        if isinstance(result, str):
+            raise HTTPException(status_code=503, detail=result)
+
+        job, deduplicated = result
+        return {**_JobStatus(job), "deduplicated": deduplicated}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao enfileirar job {request.kind} de {request.props.symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Retorna o status e o progresso do job; após a conclusão, também o resultado (ou o erro).
+    """
+    job = _jobs.Get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired.")
+    return await BuildResponse(_JobStatus, job)
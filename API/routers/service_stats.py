@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from services.SingleFlight import SingleFlight
+from services.ModelCache import ModelCache
+from services.JobQueue import JobQueue
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/stats")
+def get_service_stats():
+    """
+    Retorna os contadores internos dos serviços (requisições coalescidas, caches, filas de jobs, etc.).
+    """
+    return {
+        "singleflight": SingleFlight.AllStats(),
+        "caches": ModelCache.AllStats(),
+        "jobs": JobQueue.AllStats()
+    }
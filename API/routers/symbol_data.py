@@ -1,32 +1,85 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from services.Quotations import Quotations
 from schemas.symbol_properties import SymbolProperties
+from entities.ResponseFormat import ResponseFormat
+from entities.DecimationMethod import DecimationMethod
+from services.Decimation import Decimation
+from API.formats import BuildResponse, FrameResponse, NegotiateFormat
+from API.cache import CachedResponse, StoreResponse
+from typing import Any, Dict, List, Optional, Union
+import pandas as pd
 import logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
+
+# Pós-processamento e serialização dos corpos: executados em uma thread, fora do event loop
+def _DataBody(props: SymbolProperties, df: pd.DataFrame, format: ResponseFormat, stream: bool,
+              max_points: Optional[int], decimation: DecimationMethod) -> Union[Dict[str, Any], Response]:
+    if max_points is not None:
+        df = Decimation.Decimate(df, max_points, decimation)
+        if isinstance(df, str):
+            raise HTTPException(status_code=400, detail=df)
+    return FrameResponse(df.reset_index(), format, {"symbol": props.symbol}, "data", stream)
+
+def _BatchBody(results: Dict[str, Union[pd.DataFrame, str]]) -> Dict[str, Any]:
+    return {
+        "data": {
+            symbol: df.reset_index().to_dict(orient="records")
+            for symbol, df in results.items() if not isinstance(df, str)
+        },
+        "errors": {
+            symbol: df
+            for symbol, df in results.items() if isinstance(df, str)
+        }
+    }
+
 @router.post("/data")
-def get_symbol_data(props: SymbolProperties):
+async def get_symbol_data(request: Request, props: SymbolProperties, format: Optional[ResponseFormat] = None,
+                          stream: bool = False, max_points: Optional[int] = None,
+                          decimation: DecimationMethod = DecimationMethod.MINMAX):
     """
     Retorna cotações históricas com base nas propriedades enviadas.
+    O formato da resposta (records, columns, arrow, parquet ou ndjson) vem de format ou do cabeçalho Accept;
+    com stream=true ela é enviada em fatias, sem montar o documento inteiro em memória.
+    Com max_points, as barras são reduzidas para o gráfico (minmax preserva máximas e mínimas; lttb preserva a forma).
+    Respostas repetidas saem do cache com ETag (If-None-Match devolve 304).
     """
     try:
+        cached = CachedResponse(request, props)
+        if cached is not None:
+            return cached
+
         quotation_service = Quotations()
-        df = quotation_service.Get(
-            props.symbol,
-            props.start_date,
-            props.end_date,
-            props.granularity
-        )
+        df = await quotation_service.GetAsync(props)
 
         if isinstance(df, str):
             raise HTTPException(status_code=400, detail=df)
-        
-        return {
-            "symbol": props.symbol,
-            "data": df.reset_index().to_dict(orient="records")
-        }
+
+        return await StoreResponse(request, props, _DataBody, props, df, NegotiateFormat(request, format), stream,
+                                   max_points, decimation)
 
     except Exception as e:
         logger.error(f"Erro ao obter dados de {props.symbol}: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/data/batch")
+async def get_symbols_data(props: List[SymbolProperties]):
+    """
+    Retorna cotações históricas de vários símbolos em uma única requisição.
+    Erros são reportados por símbolo, sem interromper os demais.
+    """
+    try:
+        quotation_service = Quotations()
+        results = await quotation_service.GetManyAsync(props)
+
+        if isinstance(results, str):
+            raise HTTPException(status_code=400, detail=results)
+
+        return await BuildResponse(_BatchBody, results)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao obter dados em lote: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,31 +1,143 @@
-from fastapi import APIRouter, HTTPException
-from services.HiddenMarkovModel import HiddenMarkovModel
+from fastapi import APIRouter, HTTPException, Query, Request
+from services.HiddenMarkovModel import HiddenMarkovModel, HMM_RESTARTS
+from services.HmmIncremental import HmmIncremental
 from schemas.symbol_properties import SymbolProperties
+from entities.SelectionCriterion import SelectionCriterion
+from entities.Feature import Feature
+from entities.ResponseFormat import ResponseFormat
+from API.formats import BuildResponse, NegotiateFormat
+from API.cache import CachedResponse, StoreResponse
+from API.responses import MarkovRegimesBody, MarkovBestBody
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
+
+# Pós-processamento e serialização dos corpos: executados em uma thread, fora do event loop
+def _BatchBody(summary: pd.DataFrame, regimes: Optional[pd.DataFrame], errors: Dict[str, str]) -> Dict[str, Any]:
+    response = {
+        "summary": summary.replace([np.nan, np.inf, -np.inf], None).to_dict(orient="records"),
+        "errors": errors
+    }
+    if regimes is not None:
+        response["regimes"] = regimes.replace([np.nan, np.inf, -np.inf], None).reset_index().to_dict(orient="records")
+    return response
+
 @router.post("/markov_regimes")
-def get_markov_regimes(props: SymbolProperties, n_regimes: int):
+async def get_markov_regimes(request: Request, props: SymbolProperties, n_regimes: int,
+                             features: Optional[List[Feature]] = Query(None), format: Optional[ResponseFormat] = None,
+                             stream: bool = False):
     """
     Retorna os regimes de mercado identificados pelo modelo Hidden Markov.
+    As features do modelo podem ser escolhidas em features (padrão: volatility_21, price_range e atr_14).
+    O formato da resposta (records, columns, arrow, parquet ou ndjson) vem de format ou do cabeçalho Accept;
+    com stream=true ela é enviada em fatias, sem montar o documento inteiro em memória.
+    Respostas repetidas saem do cache com ETag (If-None-Match devolve 304).
     """
     try:
+        cached = CachedResponse(request, props)
+        if cached is not None:
+            return cached
+
         hmm_service = HiddenMarkovModel()
-        result = hmm_service.GetRegimes(
+        result = await hmm_service.GetRegimesAsync(
             symbolInfos=props,
-            n_regimes=n_regimes
+            n_regimes=n_regimes,
+            features=features
         )
 
         if isinstance(result, str):
             raise HTTPException(status_code=400, detail=result)
         
+        return await StoreResponse(request, props, MarkovRegimesBody, props, result, NegotiateFormat(request, format), stream)
+
+    except Exception as e:
+        logger.error(f"Erro ao obter regimes de {props.symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/markov_regimes/batch")
+async def get_markov_regimes_batch(props: List[SymbolProperties], n_regimes: List[int] = Query(...),
+                                   features: Optional[List[Feature]] = Query(None), series: bool = False):
+    """
+    Retorna os regimes de vários símbolos e vários valores de K em uma única requisição: um resumo por
+    (símbolo, K) com o regime atual e, se series=true, as séries completas em formato longo. Erros são
+    reportados por símbolo (download) ou por símbolo:K (ajuste), sem interromper os demais.
+    """
+    try:
+        result = await HiddenMarkovModel.GetRegimesBatchAsync(
+            symbols=props,
+            n_regimes=n_regimes,
+            features=features,
+            series=series
+        )
+
+        if isinstance(result, str):
+            raise HTTPException(status_code=400, detail=result)
+
+        return await BuildResponse(_BatchBody, *result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao obter regimes em lote: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/markov_regimes/best")
+async def get_best_markov_regimes(props: SymbolProperties, min_regimes: int, max_regimes: int,
+                                  restarts: int = HMM_RESTARTS, criterion: SelectionCriterion = SelectionCriterion.BIC,
+                                  features: Optional[List[Feature]] = Query(None)):
+    """
+    Ajusta o HMM com restarts sementes aleatórias para cada número de regimes entre min_regimes e max_regimes,
+    em paralelo, escolhe o melhor pelo critério informado (AIC, BIC ou log-verossimilhança) e retorna seus
+    regimes junto com a tabela comparativa.
+    """
+    try:
+        result = await HiddenMarkovModel.GetBestRegimesAsync(
+            symbolInfos=props,
+            min_regimes=min_regimes,
+            max_regimes=max_regimes,
+            restarts=restarts,
+            criterion=criterion,
+            features=features
+        )
+
+        if isinstance(result, str):
+            raise HTTPException(status_code=400, detail=result)
+
+        return await BuildResponse(MarkovBestBody, props, criterion, *result)
+
+    except Exception as e:
+        logger.error(f"Erro ao selecionar modelo HMM de {props.symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/markov_regimes/incremental")
+async def get_markov_regime_incremental(props: SymbolProperties, n_regimes: int):
+    """
+    Retorna o regime atual e as probabilidades filtradas de cada regime, atualizadas de forma incremental:
+    as barras novas passam apenas pelo passo forward do HMM já ajustado, e a reestimação completa só ocorre
+    periodicamente.
+    """
+    try:
+        result = await HmmIncremental.UpdateRegimeAsync(
+            symbolInfos=props,
+            n_regimes=n_regimes
+        )
+
+        if isinstance(result, str):
+            raise HTTPException(status_code=400, detail=result)
+
         return {
             "symbol": props.symbol,
-            "regimes": result.reset_index().to_dict(orient="records")
+            "timestamp": result.timestamp,
+            "regime": result.regime,
+            "probabilities": result.probabilities,
+            "bars_since_fit": result.barsSinceFit
         }
 
     except Exception as e:
-        logger.error(f"Erro ao obter regimes de {props.symbol}: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        logger.error(f"Erro ao atualizar regime de {props.symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,39 +1,226 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from services.GarchLevels import GarchLevels
+from services.GarchIncremental import GarchIncremental, GARCH_REFIT_BARS
+from services.GarchBacktest import GarchBacktest, BACKTEST_TRAIN_WINDOW, BACKTEST_MIN_TRAIN_BARS
+from services.GarchForecast import GarchForecast, FORECAST_PATHS
 from schemas.symbol_properties import SymbolProperties
 from entities.ArchModels import ArchModelType
 from entities.Distribution import DistributionType
+from entities.SelectionCriterion import SelectionCriterion
+from entities.ResponseFormat import ResponseFormat
+from entities.DecimationMethod import DecimationMethod
+from API.formats import BuildResponse, NegotiateFormat
+from API.cache import CachedResponse, StoreResponse
+from API.responses import GarchLevelsBody, GarchBestBody, GarchForecastBody, GarchBacktestBody
+from typing import Any, Dict, List, Optional, Tuple, Union
 import numpy as np
+import pandas as pd
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Pós-processamento e serialização dos corpos: executados em uma thread, fora do event loop
+def _LevelsBody(props: SymbolProperties, levels_df: pd.DataFrame, format: ResponseFormat, stream: bool,
+                max_points: Optional[int], decimation: DecimationMethod,
+                multipliers: Tuple[float, ...]) -> Union[Dict[str, Any], Response]:
+    if max_points is not None:
+        levels_df = GarchLevels.DecimateLevels(levels_df, max_points, decimation, multipliers)
+        if isinstance(levels_df, str):
+            raise HTTPException(status_code=400, detail=levels_df)
+    return GarchLevelsBody(props, levels_df, format, stream)
+
+def _BatchBody(levels_df: pd.DataFrame, errors: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        "garch_levels": levels_df.replace([np.nan, np.inf, -np.inf], None).reset_index().to_dict(orient="records"),
+        "errors": errors
+    }
+
+def _IncrementalBody(props: SymbolProperties, levels_df: pd.DataFrame) -> Dict[str, Any]:
+    return {
+        "symbol": props.symbol,
+        "garch_levels": levels_df.replace([np.nan, np.inf, -np.inf], None).reset_index(drop=True).to_dict(orient="records")
+    }
+
 @router.post("/garch_levels")
-def get_garch_levels(props: SymbolProperties, modelType: ArchModelType, distribution: DistributionType, levels: int):
+async def get_garch_levels(request: Request, props: SymbolProperties, modelType: ArchModelType, distribution: DistributionType,
+                           levels: int, step: float = 1.0, multipliers: Optional[List[float]] = Query(None),
+                           format: Optional[ResponseFormat] = None, stream: bool = False, max_points: Optional[int] = None,
+                           decimation: DecimationMethod = DecimationMethod.MINMAX):
     """
     Retorna os níveis de volatilidade estimados pelo modelo GARCH.
+    Os níveis são múltiplos de step (ex.: 0.5 gera ±0.5σ, ±1σ, ...) ou a lista explícita em multipliers.
+    O formato da resposta (records, columns, arrow, parquet ou ndjson) vem de format ou do cabeçalho Accept;
+    com stream=true ela é enviada em fatias, sem montar o documento inteiro em memória.
+    Com max_points, as barras são reduzidas para o gráfico (minmax preserva as máximas, mínimas, picos de
+    volatilidade e os extremos de cada nível; lttb preserva a forma do fechamento).
+    Respostas repetidas saem do cache com ETag (If-None-Match devolve 304).
     """
     try:
+        cached = CachedResponse(request, props)
+        if cached is not None:
+            return cached
+
         garch_service = GarchLevels()
-        result = garch_service.GetLevels(
+        result = await garch_service.GetLevelsAsync(
             symbolInfos=props,
             modelType=modelType,
             distribution=distribution,
-            levels=levels
+            levels=levels,
+            step=step,
+            multipliers=multipliers
             )
 
         if isinstance(result, str):
             raise HTTPException(status_code=400, detail=result)
-        
-        # Substituir NaN por None (que é convertido para null em JSON)
-        result_cleaned = result.replace([np.nan, np.inf, -np.inf], None)
-        
-        return {
-            "symbol": props.symbol,
-            "garch_levels": result_cleaned.reset_index().to_dict(orient="records")
-        }
+
+        return await StoreResponse(request, props, _LevelsBody, props, result, NegotiateFormat(request, format), stream,
+                                   max_points, decimation, GarchLevels.LevelMultipliers(levels, step, multipliers))
 
     except Exception as e:
         logger.error(f"Erro ao obter níveis GARCH de {props.symbol}: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/garch_levels/batch")
+async def get_garch_levels_batch(props: List[SymbolProperties], modelType: ArchModelType, distribution: DistributionType, levels: int,
+                                 step: float = 1.0, multipliers: Optional[List[float]] = Query(None)):
+    """
+    Retorna os níveis de volatilidade GARCH de vários símbolos em uma única requisição, em formato longo
+    (coluna symbol). Erros são reportados por símbolo, sem interromper os demais.
+    """
+    try:
+        result = await GarchLevels.GetLevelsBatchAsync(
+            symbols=props,
+            modelType=modelType,
+            distribution=distribution,
+            levels=levels,
+            step=step,
+            multipliers=multipliers
+            )
+
+        if isinstance(result, str):
+            raise HTTPException(status_code=400, detail=result)
+
+        return await BuildResponse(_BatchBody, *result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao obter níveis GARCH em lote: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/garch_levels/incremental")
+async def get_garch_levels_incremental(props: SymbolProperties, modelType: ArchModelType, distribution: DistributionType, levels: int,
+                                       step: float = 1.0, multipliers: Optional[List[float]] = Query(None)):
+    """
+    Retorna os níveis de volatilidade na própria granularidade solicitada, atualizados de forma incremental:
+    as barras novas passam pela recursão da variância com os parâmetros já estimados, e a reestimação
+    completa só ocorre periodicamente.
+    """
+    try:
+        result = await GarchIncremental.UpdateLevelsAsync(
+            symbolInfos=props,
+            modelType=modelType,
+            distribution=distribution,
+            levels=levels,
+            step=step,
+            multipliers=multipliers
+            )
+
+        if isinstance(result, str):
+            raise HTTPException(status_code=400, detail=result)
+
+        return await BuildResponse(_IncrementalBody, props, result)
+
+    except Exception as e:
+        logger.error(f"Erro ao atualizar níveis GARCH de {props.symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/garch_levels/forecast")
+async def get_garch_forecast(props: SymbolProperties, modelType: ArchModelType, distribution: DistributionType, levels: int,
+                             horizon: int, step: float = 1.0, multipliers: Optional[List[float]] = Query(None),
+                             paths: int = FORECAST_PATHS, seed: Optional[int] = None):
+    """
+    Retorna a previsão de volatilidade para os próximos horizon barras e as bandas de preço acumuladas em cada
+    horizonte. Usa a previsão analítica quando existe (GARCH, FIGARCH e EGARCH em h=1) e, no EGARCH com h>1,
+    simulação com paths caminhos (seed para reprodutibilidade).
+    """
+    try:
+        result = await GarchForecast.ForecastAsync(
+            symbolInfos=props,
+            modelType=modelType,
+            distribution=distribution,
+            horizon=horizon,
+            levels=levels,
+            step=step,
+            multipliers=multipliers,
+            paths=paths,
+            seed=seed
+            )
+
+        if isinstance(result, str):
+            raise HTTPException(status_code=400, detail=result)
+
+        return await BuildResponse(GarchForecastBody, props, *result)
+
+    except Exception as e:
+        logger.error(f"Erro ao prever volatilidade GARCH de {props.symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/garch_levels/best")
+async def get_best_garch_levels(props: SymbolProperties, levels: int, criterion: SelectionCriterion = SelectionCriterion.BIC,
+                                step: float = 1.0, multipliers: Optional[List[float]] = Query(None)):
+    """
+    Ajusta todas as combinações de modelo e distribuição em paralelo, escolhe a melhor pelo critério
+    informado (AIC, BIC ou log-verossimilhança) e retorna seus níveis junto com a tabela comparativa.
+    """
+    try:
+        result = await GarchLevels.GetBestLevelsAsync(
+            symbolInfos=props,
+            levels=levels,
+            criterion=criterion,
+            step=step,
+            multipliers=multipliers
+            )
+
+        if isinstance(result, str):
+            raise HTTPException(status_code=400, detail=result)
+
+        return await BuildResponse(GarchBestBody, props, criterion, *result)
+
+    except Exception as e:
+        logger.error(f"Erro ao selecionar modelo GARCH de {props.symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/garch_levels/backtest")
+async def backtest_garch_levels(props: SymbolProperties, modelType: ArchModelType, distribution: DistributionType, levels: int,
+                                step: float = 1.0, multipliers: Optional[List[float]] = Query(None),
+                                refitEvery: int = GARCH_REFIT_BARS, trainWindow: int = BACKTEST_TRAIN_WINDOW,
+                                minTrainBars: int = BACKTEST_MIN_TRAIN_BARS):
+    """
+    Backtest walk-forward das bandas de volatilidade: o modelo é reestimado a cada refitEvery barras e, entre
+    as reestimações, a variância é filtrada com os parâmetros congelados. Retorna cobertura, rompimentos e
+    toques por nível, fora da amostra.
+    """
+    try:
+        result = await GarchBacktest.BacktestAsync(
+            symbolInfos=props,
+            modelType=modelType,
+            distribution=distribution,
+            levels=levels,
+            step=step,
+            multipliers=multipliers,
+            refitEvery=refitEvery,
+            trainWindow=trainWindow,
+            minTrainBars=minTrainBars
+            )
+
+        if isinstance(result, str):
+            raise HTTPException(status_code=400, detail=result)
+
+        return await BuildResponse(GarchBacktestBody, props, *result)
+
+    except Exception as e:
+        logger.error(f"Erro no backtest dos níveis GARCH de {props.symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
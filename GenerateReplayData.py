@@ -0,0 +1,66 @@
+import json
+import numpy as np
+import pandas as pd
+import logging
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+from services.QuotationProviders import REPLAY_DTYPE, REPLAY_DATA_PATH, ReplayProvider
+
+# Chaves usadas em mock_data/quotations.json -> valores de Granularity
+MOCK_GRANULARITIES = {
+    "daily": "1d",
+    "15min": "15m",
+}
+
+# O JSON guarda apenas o offset UTC; todos os símbolos de entities/Symbols são negociados em Nova York
+EXCHANGE_TZ = "America/New_York"
+
+def records_to_bars(records):
+    """Converte os registros de um símbolo/granularidade em linhas do layout binário"""
+    df = pd.DataFrame(records)
+    index_name = "Date" if "Date" in df.columns else "Datetime"
+    timestamps = pd.to_datetime(df[index_name], utc=True)
+
+    bars = np.zeros(len(df), dtype=REPLAY_DTYPE)
+    bars["ts"] = timestamps.astype("datetime64[ns, UTC]").array.asi8
+    for name in REPLAY_DTYPE.names:
+        if name != "ts":
+            bars[name] = df[name].to_numpy() if name in df.columns else 0
+    bars.sort(order="ts")
+    return bars, index_name
+
+def main(source='mock_data/quotations.json', target=REPLAY_DATA_PATH):
+    """Gera o arquivo binário do provider de replay a partir do JSON de cotações mockadas"""
+    with open(source) as f:
+        quotations = json.load(f)
+
+    partitions = []
+    index = {}
+    offset = 0
+    for symbol, granularities in quotations.items():
+        for key, records in granularities.items():
+            if key not in MOCK_GRANULARITIES or not isinstance(records, list) or not records:
+                logger.warning(f"Ignorando {symbol}/{key}")
+                continue
+
+            bars, index_name = records_to_bars(records)
+            index.setdefault(symbol, {})[MOCK_GRANULARITIES[key]] = {
+                "start": offset,
+                "stop": offset + len(bars),
+                "tz": EXCHANGE_TZ,
+                "index_name": index_name,
+            }
+            partitions.append(bars)
+            offset += len(bars)
+
+    np.save(target, np.concatenate(partitions))
+    with open(ReplayProvider.IndexPath(target), 'w') as f:
+        json.dump(index, f, indent=2)
+    logger.info(f"✓ {offset} barras salvas em '{target}'")
+
+if __name__ == "__main__":
+    main()
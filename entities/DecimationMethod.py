@@ -0,0 +1,8 @@
+from enum import Enum
+
+class DecimationMethod(str, Enum):
+    MINMAX = "minmax"
+    LTTB = "lttb"
+
+    def __str__(self):
+        return self.value
@@ -0,0 +1,14 @@
+from enum import Enum
+
+class Feature(str, Enum):
+    RETURNS = "returns"
+    VOLATILITY_5 = "volatility_5"
+    VOLATILITY_21 = "volatility_21"
+    VOLATILITY_63 = "volatility_63"
+    PRICE_RANGE = "price_range"
+    VOLUME_NORM = "volume_norm"
+    TR = "tr"
+    ATR_14 = "atr_14"
+
+    def __str__(self):
+        return self.value
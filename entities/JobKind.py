@@ -0,0 +1,12 @@
+from enum import Enum
+
+class JobKind(str, Enum):
+    GARCH_LEVELS = "garch_levels"
+    GARCH_LEVELS_BEST = "garch_levels_best"
+    GARCH_LEVELS_FORECAST = "garch_levels_forecast"
+    GARCH_LEVELS_BACKTEST = "garch_levels_backtest"
+    MARKOV_REGIMES = "markov_regimes"
+    MARKOV_REGIMES_BEST = "markov_regimes_best"
+
+    def __str__(self):
+        return self.value
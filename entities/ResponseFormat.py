@@ -0,0 +1,11 @@
+from enum import Enum
+
+class ResponseFormat(str, Enum):
+    RECORDS = "records"
+    COLUMNS = "columns"
+    ARROW = "arrow"
+    PARQUET = "parquet"
+    NDJSON = "ndjson"
+
+    def __str__(self):
+        return self.value
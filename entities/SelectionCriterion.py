@@ -0,0 +1,6 @@
+from enum import Enum
+
+class SelectionCriterion(Enum):
+    AIC = "aic"
+    BIC = "bic"
+    LOGLIKELIHOOD = "loglikelihood"
@@ -1,9 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from API.routers import symbol_data
 from API.routers import symbol_hmm
 from API.routers import symbol_volatility
+from API.routers import service_stats
+from API.routers import jobs
+from services.Executors import ShutdownProcessPool
+from services.JobQueue import JobQueue
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Cancela os workers dos jobs antes de encerrar o pool que eles usam
+    await JobQueue.StopAll()
+    # Encerra o pool de processos compartilhado pelos ajustes de modelos
+    ShutdownProcessPool()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 def read_root():
@@ -11,4 +24,6 @@ def read_root():
 
 app.include_router(symbol_data.router)
 app.include_router(symbol_hmm.router)
-app.include_router(symbol_volatility.router)
\ No newline at end of file
+app.include_router(symbol_volatility.router)
+app.include_router(service_stats.router)
+app.include_router(jobs.router)
\ No newline at end of file
@@ -0,0 +1,58 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List, Optional
+from entities.ArchModels import ArchModelType
+from entities.Distribution import DistributionType
+from entities.SelectionCriterion import SelectionCriterion
+from entities.Feature import Feature
+from entities.JobKind import JobKind
+from schemas.symbol_properties import SymbolProperties
+from services.GarchIncremental import GARCH_REFIT_BARS
+from services.GarchBacktest import BACKTEST_TRAIN_WINDOW, BACKTEST_MIN_TRAIN_BARS
+from services.GarchForecast import FORECAST_PATHS
+from services.HiddenMarkovModel import HMM_RESTARTS
+
+class JobRequest(BaseModel):
+    kind: JobKind
+    props: SymbolProperties
+    # Mesmos parâmetros de query do endpoint correspondente (validados pelo schema do tipo do job)
+    params: Dict[str, Any] = {}
+    # Jobs de maior prioridade saem da fila primeiro
+    priority: int = 0
+
+# Parâmetros por tipo de job, com os mesmos nomes e padrões dos endpoints síncronos; nomes desconhecidos são erro
+class JobParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+class GarchLevelsParams(JobParams):
+    modelType: ArchModelType
+    distribution: DistributionType
+    levels: int
+    step: float = 1.0
+    multipliers: Optional[List[float]] = None
+
+class GarchBestParams(JobParams):
+    levels: int
+    criterion: SelectionCriterion = SelectionCriterion.BIC
+    step: float = 1.0
+    multipliers: Optional[List[float]] = None
+
+class GarchForecastParams(GarchLevelsParams):
+    horizon: int
+    paths: int = FORECAST_PATHS
+    seed: Optional[int] = None
+
+class GarchBacktestParams(GarchLevelsParams):
+    refitEvery: int = GARCH_REFIT_BARS
+    trainWindow: int = BACKTEST_TRAIN_WINDOW
+    minTrainBars: int = BACKTEST_MIN_TRAIN_BARS
+
+class MarkovRegimesParams(JobParams):
+    n_regimes: int
+    features: Optional[List[Feature]] = None
+
+class MarkovBestParams(JobParams):
+    min_regimes: int
+    max_regimes: int
+    restarts: int = HMM_RESTARTS
+    criterion: SelectionCriterion = SelectionCriterion.BIC
+    features: Optional[List[Feature]] = None
@@ -0,0 +1,224 @@
+import os
+import json
+import datetime
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (AbstractHolidayCalendar, Holiday, GoodFriday, USLaborDay, USMartinLutherKingJr,
+                                    USMemorialDay, USPresidentsDay, USThanksgivingDay, nearest_workday,
+                                    sunday_to_monday)
+from typing import Callable, Dict, List, Tuple, Union
+from schemas.symbol_properties import SymbolProperties
+from services.Resampler import Resampler, INTRADAY_MINUTES
+
+logger = logging.getLogger(__name__)
+
+BAR_STORE_PATH = os.getenv(
+    "BAR_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bar_store")
+)
+BAR_STORE_ENABLED = os.getenv("BAR_STORE_ENABLED", "1") == "1"
+
+DateRange = Tuple[datetime.date, datetime.date]
+
+class NyseHolidayCalendar(AbstractHolidayCalendar):
+    # Feriados regulares da NYSE; fechamentos extraordinários (luto oficial, furacões) não estão aqui
+    rules = [
+        Holiday("NewYearsDay", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("IndependenceDay", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+    ]
+
+class BarStore:
+    # Um lock por partição (símbolo + granularidade) para serializar leitura/escrita no mesmo processo
+    _locks: Dict[str, threading.Lock] = {}
+    _locksGuard = threading.Lock()
+
+    def __init__(self, root: str = BAR_STORE_PATH) -> None:
+        self.root = root
+
+    def _PartitionPaths(self, symbol: str, granularity: str) -> Tuple[str, str]:
+        base = os.path.join(self.root, symbol, granularity)
+        return f"{base}.parquet", f"{base}.coverage.json"
+
+    @classmethod
+    def _Lock(cls, key: str) -> threading.Lock:
+        with cls._locksGuard:
+            if key not in cls._locks:
+                cls._locks[key] = threading.Lock()
+            return cls._locks[key]
+
+    @staticmethod
+    def _MergeRanges(ranges: List[DateRange]) -> List[DateRange]:
+        merged: List[DateRange] = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    @staticmethod
+    def _MissingRanges(coverage: List[DateRange], start: datetime.date, end: datetime.date) -> List[DateRange]:
+        # Intervalos semiabertos [start, end), como o parâmetro end do yfinance
+        missing: List[DateRange] = []
+        cursor = start
+        for covered_start, covered_end in coverage:
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+            if cursor >= end:
+                break
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    @staticmethod
+    def _CoveredRanges(coverage: List[DateRange], start: datetime.date, end: datetime.date) -> List[DateRange]:
+        return [
+            (max(covered_start, start), min(covered_end, end))
+            for covered_start, covered_end in coverage
+            if covered_start < end and covered_end > start
+        ]
+
+    @staticmethod
+    def _SliceRange(df: pd.DataFrame, start: datetime.date, end: datetime.date) -> pd.DataFrame:
+        if df.empty:
+            return df
+        tz = getattr(df.index, "tz", None)
+        lower = pd.Timestamp(start, tz=tz)
+        upper = pd.Timestamp(end, tz=tz)
+        return df[(df.index >= lower) & (df.index < upper)]
+
+    @staticmethod
+    def _HasSessions(start: datetime.date, end: datetime.date) -> bool:
+        # Dias úteis da bolsa em [start, end): fins de semana e feriados regulares não têm pregão
+        holidays = NyseHolidayCalendar().holidays(start, end).date
+        return np.busday_count(start, end, holidays=holidays.astype("datetime64[D]")) > 0
+
+    def _ReadCoverage(self, coverage_path: str) -> List[DateRange]:
+        if not os.path.exists(coverage_path):
+            return []
+        with open(coverage_path) as f:
+            raw = json.load(f)
+        return [(datetime.date.fromisoformat(s), datetime.date.fromisoformat(e)) for s, e in raw]
+
+    def _WriteCoverage(self, coverage_path: str, coverage: List[DateRange]) -> None:
+        tmp_path = f"{coverage_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([[s.isoformat(), e.isoformat()] for s, e in coverage], f)
+        os.replace(tmp_path, coverage_path)
+
+    def _ReadBars(self, data_path: str) -> pd.DataFrame:
+        if not os.path.exists(data_path):
+            return pd.DataFrame()
+        return pd.read_parquet(data_path)
+
+    def _WriteBars(self, data_path: str, df: pd.DataFrame) -> None:
+        tmp_path = f"{data_path}.tmp"
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, data_path)
+
+    def _Derive(self, symbol: str, granularity: str,
+                missing: List[DateRange]) -> Tuple[List[pd.DataFrame], List[DateRange], List[DateRange]]:
+        # Monta barras intradiárias mais grossas a partir de partições mais finas já armazenadas localmente.
+        # Diário e semanal não são derivados: o fechamento oficial e o volume do leilão e de fora do pregão
+        # não estão nas barras intradiárias, então essas partições vêm sempre do provider.
+        derived: List[pd.DataFrame] = []
+        derivedRanges: List[DateRange] = []
+        if granularity not in INTRADAY_MINUTES:
+            return derived, derivedRanges, missing
+        for source in Resampler.Sources(granularity):
+            if not missing:
+                break
+            data_path, coverage_path = self._PartitionPaths(symbol, source)
+            # Locks sempre adquiridos da granularidade mais grossa para a mais fina: sem deadlock
+            with self._Lock(f"{symbol}/{source}"):
+                source_coverage = self._ReadCoverage(coverage_path)
+                usable: List[DateRange] = []
+                for missing_start, missing_end in missing:
+                    for covered_start, covered_end in self._CoveredRanges(source_coverage, missing_start, missing_end):
+                        aligned_start, aligned_end = Resampler.AlignRange(granularity, covered_start, covered_end)
+                        if aligned_start < aligned_end:
+                            usable.append((aligned_start, aligned_end))
+                if not usable:
+                    continue
+                source_bars = self._ReadBars(data_path)
+
+            for usable_start, usable_end in usable:
+                resampled = Resampler.Resample(self._SliceRange(source_bars, usable_start, usable_end), granularity)
+                if not resampled.empty:
+                    derived.append(resampled)
+            derivedRanges.extend(usable)
+            usable = self._MergeRanges(usable)
+            missing = [
+                gap
+                for missing_start, missing_end in missing
+                for gap in self._MissingRanges(usable, missing_start, missing_end)
+            ]
+            logger.info(f"Derived {granularity} bars for {symbol} from {source} bars over {len(usable)} range(s)")
+        return derived, derivedRanges, missing
+
+    def Get(self, symbolInfos: SymbolProperties,
+            fetch: Callable[[str, str], Union[pd.DataFrame, str]]) -> Union[pd.DataFrame, str]:
+        symbol = symbolInfos.symbol.value
+        granularity = symbolInfos.granularity.value
+        start = datetime.date.fromisoformat(symbolInfos.start_date)
+        end = datetime.date.fromisoformat(symbolInfos.end_date)
+        if end <= start:
+            return pd.DataFrame()
+
+        data_path, coverage_path = self._PartitionPaths(symbol, granularity)
+        with self._Lock(f"{symbol}/{granularity}"):
+            coverage = self._ReadCoverage(coverage_path)
+            missing = self._MissingRanges(coverage, start, end)
+            bars = self._ReadBars(data_path)
+            if not missing:
+                logger.info(f"Bar store hit for {symbol} {granularity} from {start} to {end}")
+                return self._SliceRange(bars, start, end)
+
+            # Só vai ao provider o histórico que as barras mais finas locais não cobrem
+            fetched, derivedRanges, missing = self._Derive(symbol, granularity, missing)
+            coverage.extend(derivedRanges)
+
+            # Barras de hoje ainda podem mudar: só os dias já encerrados entram na cobertura.
+            # O yfinance devolve um DataFrame vazio também em falhas (rate limit, rede): um intervalo encerrado sem
+            # barras só é registrado se não tem pregão (fim de semana ou feriado), senão é buscado de novo depois.
+            today = datetime.date.today()
+            covered = len(coverage)
+            for missing_start, missing_end in missing:
+                df = fetch(missing_start.isoformat(), missing_end.isoformat())
+                if isinstance(df, str):
+                    return df
+                final_end = min(missing_end, today)
+                if df.empty and self._HasSessions(missing_start, final_end):
+                    logger.warning(f"No bars for {symbol} {granularity} from {missing_start} to {missing_end}; "
+                                   f"range left uncovered")
+                    continue
+                if not df.empty:
+                    fetched.append(df)
+                if missing_start < final_end:
+                    coverage.append((missing_start, final_end))
+
+            if fetched or len(coverage) > covered:
+                os.makedirs(os.path.dirname(data_path), exist_ok=True)
+                if fetched:
+                    bars = pd.concat([bars, *fetched]) if not bars.empty else pd.concat(fetched)
+                    bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+                    self._WriteBars(data_path, bars)
+                self._WriteCoverage(coverage_path, self._MergeRanges(coverage))
+                logger.info(f"Bar store updated for {symbol} {granularity} with {len(fetched)} new range(s)")
+
+            return self._SliceRange(bars, start, end)
@@ -0,0 +1,87 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Tuple, Union
+from entities.DecimationMethod import DecimationMethod
+
+logger = logging.getLogger(__name__)
+
+# Menor max_points aceito: primeira e última barra mais ao menos um balde
+MIN_POINTS = 3
+
+class Decimation:
+    @staticmethod
+    def _Positions(df: pd.DataFrame) -> np.ndarray:
+        # Eixo x: horário das barras (preserva lacunas como noites e fins de semana) ou a posição
+        if isinstance(df.index, pd.DatetimeIndex):
+            return df.index.as_unit('ns').asi8.astype(np.float64)
+        return np.arange(len(df), dtype=np.float64)
+
+    @staticmethod
+    def MinMaxIndices(df: pd.DataFrame, maxPoints: int, highs: Tuple[str, ...], lows: Tuple[str, ...]) -> np.ndarray:
+        # Baldes de tamanho igual; em cada um, as barras do máximo de cada coluna de highs e do mínimo de cada coluna de
+        # lows (os extremos visíveis do gráfico), além da primeira e da última barra
+        n = len(df)
+        perBucket = len(highs) + len(lows)
+        buckets = max(1, (maxPoints - 2) // perBucket)
+        size = -(-(n - 2) // buckets)
+        padded = buckets * size
+
+        selected = [np.array([0, n - 1])]
+        for columns, fill, pick in ((highs, -np.inf, np.argmax), (lows, np.inf, np.argmin)):
+            for column in columns:
+                values = np.full(padded, fill)
+                middle = df[column].to_numpy(dtype=np.float64)[1:-1]
+                values[:n - 2] = np.where(np.isnan(middle), fill, middle)
+                offsets = pick(values.reshape(buckets, size), axis=1)
+                selected.append(1 + np.arange(buckets) * size + offsets)
+
+        # Baldes formados só por preenchimento apontam além da última barra
+        return np.unique(np.minimum(np.concatenate(selected), n - 1))
+
+    @staticmethod
+    def LttbIndices(df: pd.DataFrame, maxPoints: int, column: str) -> np.ndarray:
+        # Largest-Triangle-Three-Buckets: em cada balde, a barra que forma o maior triângulo com o ponto escolhido no
+        # balde anterior e a média do balde seguinte. Médias dos baldes calculadas de uma vez com reduceat.
+        x = Decimation._Positions(df)
+        y = df[column].to_numpy(dtype=np.float64)
+        y = np.where(np.isnan(y), np.nanmean(y), y)
+        n = len(y)
+        edges = np.linspace(1, n - 1, maxPoints - 1).astype(int)
+        counts = np.diff(edges)
+        meanX = np.r_[np.add.reduceat(x[:n - 1], edges[:-1]) / counts, x[-1]]
+        meanY = np.r_[np.add.reduceat(y[:n - 1], edges[:-1]) / counts, y[-1]]
+
+        indices = np.empty(maxPoints, dtype=np.int64)
+        indices[0] = 0
+        indices[-1] = n - 1
+        a = 0
+        for i in range(maxPoints - 2):
+            start, end = edges[i], edges[i + 1]
+            area = np.abs((x[a] - meanX[i + 1]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (meanY[i + 1] - y[a]))
+            a = start + int(np.argmax(area))
+            indices[i + 1] = a
+        return indices
+
+    @staticmethod
+    def Decimate(df: pd.DataFrame, maxPoints: int, method: DecimationMethod = DecimationMethod.MINMAX,
+                 highs: Tuple[str, ...] = ('High',), lows: Tuple[str, ...] = ('Low',),
+                 series: str = 'Close') -> Union[pd.DataFrame, str]:
+        # Seleciona barras inteiras (todas as colunas continuam alinhadas); nunca devolve mais que maxPoints linhas
+        try:
+            minimum = MIN_POINTS if method == DecimationMethod.LTTB else 2 + len(highs) + len(lows)
+            if maxPoints < minimum:
+                return f"max_points must be at least {minimum} for {method.value} decimation."
+            if len(df) <= maxPoints:
+                return df
+
+            if method == DecimationMethod.LTTB:
+                indices = Decimation.LttbIndices(df, maxPoints, series)
+            else:
+                indices = Decimation.MinMaxIndices(df, maxPoints, highs, lows)
+            logger.info(f"Decimated {len(df)} bars to {len(indices)} ({method.value}).")
+            return df.iloc[indices]
+
+        except Exception as e:
+            logger.error(f"Error decimating series: {e}")
+            return str(e)
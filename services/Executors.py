@@ -0,0 +1,83 @@
+import os
+import asyncio
+import functools
+import threading
+import logging
+import contextvars
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Processos usados para os ajustes de modelos (arch/hmmlearn seguram a GIL); 0 executa em threads
+MODEL_WORKERS = int(os.getenv("MODEL_WORKERS", str(os.cpu_count() or 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_poolGuard = threading.Lock()
+
+class PoolProgress:
+    # Tarefas enviadas ao pool e concluídas dentro de um contexto (ex.: um job); usado para reportar progresso
+    def __init__(self) -> None:
+        self._submitted = 0
+        self._completed = 0
+        # Progresso das computações compartilhadas (SingleFlight) que este contexto iniciou ou aguarda
+        self._attached: List["PoolProgress"] = []
+
+    @property
+    def submitted(self) -> int:
+        return self._submitted + sum(progress.submitted for progress in self._attached)
+
+    @property
+    def completed(self) -> int:
+        return self._completed + sum(progress.completed for progress in self._attached)
+
+    def Attach(self, progress: "PoolProgress") -> None:
+        self._attached.append(progress)
+
+    def Fraction(self) -> float:
+        submitted = self.submitted
+        return self.completed / submitted if submitted else 0.0
+
+# Contador do contexto atual; herdado pelas tarefas criadas a partir dele (asyncio.gather)
+_poolProgress: "contextvars.ContextVar[Optional[PoolProgress]]" = contextvars.ContextVar("pool_progress", default=None)
+
+def TrackPoolProgress(progress: PoolProgress) -> contextvars.Token:
+    return _poolProgress.set(progress)
+
+def UntrackPoolProgress(token: contextvars.Token) -> None:
+    _poolProgress.reset(token)
+
+def CurrentPoolProgress() -> Optional[PoolProgress]:
+    return _poolProgress.get()
+
+def GetProcessPool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if MODEL_WORKERS <= 0:
+        return None
+    with _poolGuard:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MODEL_WORKERS)
+            logger.info(f"Model process pool started with {MODEL_WORKERS} workers.")
+        return _pool
+
+def ShutdownProcessPool() -> None:
+    global _pool
+    with _poolGuard:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+            logger.info("Model process pool stopped.")
+
+async def RunInProcessPool(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    progress = _poolProgress.get()
+    if progress is not None:
+        progress._submitted += 1
+    try:
+        pool = GetProcessPool()
+        if pool is None:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+    finally:
+        if progress is not None:
+            progress._completed += 1
@@ -0,0 +1,118 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterable, NamedTuple, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+class FeatureSpec(NamedTuple):
+    dependencies: Tuple[str, ...]
+    # compute(bars, values): bars = colunas OHLCV em float64; values = features já calculadas (dependências)
+    compute: Callable[[Dict[str, np.ndarray], Dict[str, np.ndarray]], np.ndarray]
+
+class FeatureEngine:
+    @staticmethod
+    def _RollingSums(x: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray, float]:
+        # Somas móveis de x e x^2 por diferença de somas acumuladas (uma passada); janelas com NaN ficam NaN.
+        # A série é centralizada antes de acumular para evitar cancelamento numérico em séries longas.
+        missing = np.isnan(x)
+        center = float(np.nanmean(x)) if not missing.all() else 0.0
+        centered = np.where(missing, 0.0, x - center)
+        cumulative = np.r_[0.0, np.cumsum(centered)]
+        cumulativeSquares = np.r_[0.0, np.cumsum(centered * centered)]
+        cumulativeMissing = np.r_[0, np.cumsum(missing)]
+
+        sums = np.full(len(x), np.nan)
+        squares = np.full(len(x), np.nan)
+        if len(x) >= window:
+            complete = cumulativeMissing[window:] == cumulativeMissing[:-window]
+            sums[window - 1:] = np.where(complete, cumulative[window:] - cumulative[:-window], np.nan)
+            squares[window - 1:] = np.where(complete, cumulativeSquares[window:] - cumulativeSquares[:-window], np.nan)
+        return sums, squares, center
+
+    @staticmethod
+    def RollingMean(x: np.ndarray, window: int) -> np.ndarray:
+        sums, _, center = FeatureEngine._RollingSums(x, window)
+        return center + sums / window
+
+    @staticmethod
+    def RollingStd(x: np.ndarray, window: int) -> np.ndarray:
+        # Desvio padrão amostral (ddof=1), como pandas.rolling().std()
+        sums, squares, _ = FeatureEngine._RollingSums(x, window)
+        variance = (squares - sums * sums / window) / (window - 1)
+        return np.sqrt(np.maximum(variance, 0.0))
+
+    @staticmethod
+    def Resolve(features: Iterable[str]) -> Union[Tuple[str, ...], str]:
+        # Ordem de cálculo: cada feature depois das suas dependências, sem repetições
+        order = []
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            for dependency in FEATURES[name].dependencies:
+                visit(dependency)
+            order.append(name)
+
+        for name in features:
+            if name not in FEATURES:
+                return f"Unknown feature: {name}. Available: {', '.join(FEATURES)}."
+            visit(name)
+        return tuple(order)
+
+    @staticmethod
+    def Compute(df: pd.DataFrame, features: Tuple[str, ...]) -> Union[Tuple[pd.DataFrame, np.ndarray], str]:
+        try:
+            if len(features) == 0:
+                return "At least one feature is required."
+            order = FeatureEngine.Resolve(features)
+            if isinstance(order, str):
+                return order
+
+            bars = {column: df[column].to_numpy(dtype=np.float64) for column in ('High', 'Low', 'Close', 'Volume')}
+            values: Dict[str, np.ndarray] = {}
+            for name in order:
+                values[name] = FEATURES[name].compute(bars, values)
+
+            # Linhas completas: sem NaN nas colunas originais nem nas features pedidas (aquecimento das janelas)
+            valid = ~df.isna().any(axis=1).to_numpy()
+            for name in features:
+                valid &= ~np.isnan(values[name])
+
+            # Matriz contígua (barras x features) em float64, entregue diretamente ao scaler
+            matrix = np.empty((int(valid.sum()), len(features)), dtype=np.float64)
+            for j, name in enumerate(features):
+                matrix[:, j] = values[name][valid]
+
+            data = df[valid]
+            data = pd.concat([data, pd.DataFrame(matrix, index=data.index, columns=list(features))], axis=1)
+            logger.info(f"Features calculated successfully: {', '.join(features)}.")
+            return data, matrix
+
+        except Exception as e:
+            logger.error(f"Error calculating features: {e}")
+            return str(e)
+
+def _Returns(bars: Dict[str, np.ndarray], values: Dict[str, np.ndarray]) -> np.ndarray:
+    close = bars['Close']
+    return np.r_[np.nan, close[1:] / close[:-1] - 1]
+
+def _TrueRange(bars: Dict[str, np.ndarray], values: Dict[str, np.ndarray]) -> np.ndarray:
+    previousClose = np.r_[np.nan, bars['Close'][:-1]]
+    return np.maximum(bars['High'] - bars['Low'],
+                      np.maximum(np.abs(bars['High'] - previousClose), np.abs(bars['Low'] - previousClose)))
+
+# Catálogo declarativo: nome -> (dependências, cálculo). Só as features pedidas e suas dependências são calculadas.
+FEATURES: Dict[str, FeatureSpec] = {
+    'returns': FeatureSpec((), _Returns),
+    # Volatilidade realizada (janelas diferentes)
+    'volatility_5': FeatureSpec(('returns',), lambda bars, values: FeatureEngine.RollingStd(values['returns'], 5)),
+    'volatility_21': FeatureSpec(('returns',), lambda bars, values: FeatureEngine.RollingStd(values['returns'], 21)),
+    'volatility_63': FeatureSpec(('returns',), lambda bars, values: FeatureEngine.RollingStd(values['returns'], 63)),
+    # Range de preço (High-Low normalizado)
+    'price_range': FeatureSpec((), lambda bars, values: (bars['High'] - bars['Low']) / bars['Close']),
+    # Volume normalizado
+    'volume_norm': FeatureSpec((), lambda bars, values: bars['Volume'] / FeatureEngine.RollingMean(bars['Volume'], 21)),
+    # ATR (Average True Range)
+    'tr': FeatureSpec((), _TrueRange),
+    'atr_14': FeatureSpec(('tr',), lambda bars, values: FeatureEngine.RollingMean(values['tr'], 14)),
+}
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from typing import Dict, List, Optional, Tuple, Union
+from entities.ArchModels import ArchModelType
+from entities.Distribution import DistributionType
+from schemas.symbol_properties import SymbolProperties
+from services.GarchLevels import GarchLevels
+from services.GarchIncremental import GarchIncremental, GARCH_REFIT_BARS
+from services.Quotations import Quotations
+from services.Executors import RunInProcessPool, MODEL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Barras mínimas de treino antes da primeira previsão fora da amostra
+BACKTEST_MIN_TRAIN_BARS = 250
+# Janela móvel de treino em cada reestimação (0 = janela expansiva, custo crescente)
+BACKTEST_TRAIN_WINDOW = 1000
+
+class GarchBacktest:
+    @staticmethod
+    def _RunSegments(segments: List[Tuple[pd.DataFrame, pd.DataFrame]], modelType: ArchModelType,
+                     distribution: DistributionType) -> List[Union[np.ndarray, str]]:
+        # Um bloco de segmentos consecutivos por tarefa do pool; cada ajuste parte dos parâmetros do anterior
+        results = []
+        startingValues = None
+        for train, test in segments:
+            state = GarchIncremental._FitState(train, modelType, distribution, startingValues)
+            if isinstance(state, str):
+                results.append(state)
+                continue
+            startingValues = state.params.to_numpy()
+            # Entre reestimações, apenas a recursão da variância com os parâmetros congelados
+            advanced = GarchIncremental._Advance(state, test)
+            results.append(advanced.volatility.to_numpy()[-len(test):])
+        return results
+
+    @staticmethod
+    def _Segments(df: pd.DataFrame, refitEvery: int, trainWindow: int,
+                  minTrainBars: int) -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
+        segments = []
+        for start in range(minTrainBars, len(df), refitEvery):
+            train = df.iloc[max(0, start - trainWindow) if trainWindow > 0 else 0:start]
+            segments.append((train, df.iloc[start:start + refitEvery]))
+        return segments
+
+    @staticmethod
+    def _Statistics(df: pd.DataFrame, volatility: np.ndarray, multipliers: Tuple[float, ...]) -> pd.DataFrame:
+        # Banda viva de cada barra: abertura da barra ± m * volatilidade prevista com dados até a barra anterior
+        valid = ~np.isnan(volatility)
+        base = df['Open'].to_numpy(dtype=np.float64)[valid]
+        close = df['Close'].to_numpy(dtype=np.float64)[valid]
+        high = df['High'].to_numpy(dtype=np.float64)[valid]
+        low = df['Low'].to_numpy(dtype=np.float64)[valid]
+        sigma = volatility[valid]
+
+        m = np.asarray(multipliers, dtype=np.float64)[:, None]
+        upper = base * (1 + m * sigma)
+        lower = base * (1 - m * sigma)
+        above = close > upper
+        below = close < lower
+        breached = above | below
+        # Excesso além da banda em unidades de sigma, só nas barras rompidas
+        excess = np.where(breached, np.abs(close / base - 1) / sigma - m, np.nan)
+        with np.errstate(invalid='ignore'):
+            meanExcess = np.nanmean(excess, axis=1) if breached.any() else np.full(len(multipliers), np.nan)
+
+        return pd.DataFrame({
+            'level': list(multipliers),
+            'expected_coverage': 2 * norm.cdf(multipliers) - 1,
+            'coverage': 1 - breached.mean(axis=1),
+            'upper_breach_rate': above.mean(axis=1),
+            'lower_breach_rate': below.mean(axis=1),
+            'touch_rate': ((high[None, :] >= upper) | (low[None, :] <= lower)).mean(axis=1),
+            'breaches': breached.sum(axis=1),
+            'mean_excess_sigma': meanExcess,
+        })
+
+    @staticmethod
+    async def Run(df: pd.DataFrame, modelType: ArchModelType, distribution: DistributionType,
+                  multipliers: Tuple[float, ...], refitEvery: int = GARCH_REFIT_BARS,
+                  trainWindow: int = BACKTEST_TRAIN_WINDOW, minTrainBars: int = BACKTEST_MIN_TRAIN_BARS) -> Union[Tuple[pd.DataFrame, Dict[str, int]], str]:
+        try:
+            if refitEvery <= 0:
+                return "Refit interval must be a positive number of bars."
+            if minTrainBars < 3:
+                return "Training requires at least 3 bars."
+            if trainWindow < 0:
+                return "Training window must be zero (expanding) or a positive number of bars."
+
+            # A última barra ainda está em formação
+            df = df.iloc[:-1]
+            if len(df) <= minTrainBars:
+                return f"Not enough bars to backtest: {len(df)} available, {minTrainBars} required for training."
+
+            # Segmentos independentes (treino até o ponto de reestimação, teste até o próximo), em blocos por worker
+            segments = GarchBacktest._Segments(df, refitEvery, trainWindow, minTrainBars)
+            chunks = np.array_split(np.arange(len(segments)), min(len(segments), max(1, MODEL_WORKERS)))
+            results = await asyncio.gather(*(
+                RunInProcessPool(GarchBacktest._RunSegments, [segments[i] for i in chunk], modelType, distribution)
+                for chunk in chunks
+            ))
+
+            volatility = []
+            failed = 0
+            for (_, test), result in zip(segments, (result for chunk in results for result in chunk)):
+                if isinstance(result, str):
+                    failed += 1
+                    volatility.append(np.full(len(test), np.nan))
+                else:
+                    volatility.append(result)
+            volatility = np.concatenate(volatility)
+
+            tested = df.iloc[minTrainBars:]
+            statistics = GarchBacktest._Statistics(tested, volatility, multipliers)
+            summary = {
+                "bars": int((~np.isnan(volatility)).sum()),
+                "refits": len(segments),
+                "failed_refits": failed,
+            }
+            logger.info(f"Backtested {summary['bars']} bars with {summary['refits']} refits ({failed} failed).")
+            return statistics, summary
+
+        except Exception as e:
+            logger.error(f"Error running GARCH backtest: {e}")
+            return str(e)
+
+    @staticmethod
+    def Backtest(symbolInfos: SymbolProperties, modelType: ArchModelType, distribution: DistributionType,
+                 levels: int, step: float = 1.0, multipliers: Optional[List[float]] = None,
+                 refitEvery: int = GARCH_REFIT_BARS, trainWindow: int = BACKTEST_TRAIN_WINDOW,
+                 minTrainBars: int = BACKTEST_MIN_TRAIN_BARS) -> Union[Tuple[pd.DataFrame, Dict[str, int]], str]:
+        return asyncio.run(GarchBacktest.BacktestAsync(symbolInfos, modelType, distribution, levels, step, multipliers,
+                                                       refitEvery, trainWindow, minTrainBars))
+
+    @staticmethod
+    async def BacktestAsync(symbolInfos: SymbolProperties, modelType: ArchModelType, distribution: DistributionType,
+                            levels: int, step: float = 1.0, multipliers: Optional[List[float]] = None,
+                            refitEvery: int = GARCH_REFIT_BARS, trainWindow: int = BACKTEST_TRAIN_WINDOW,
+                            minTrainBars: int = BACKTEST_MIN_TRAIN_BARS) -> Union[Tuple[pd.DataFrame, Dict[str, int]], str]:
+        try:
+            multipliers = GarchLevels.LevelMultipliers(levels, step, multipliers)
+            if isinstance(multipliers, str):
+                return multipliers
+
+            df = await Quotations().GetAsync(symbolInfos)
+            if isinstance(df, str):
+                return df
+
+            return await GarchBacktest.Run(df, modelType, distribution, multipliers, refitEvery, trainWindow, minTrainBars)
+
+        except Exception as e:
+            logger.error(f"Error backtesting volatility levels for {symbolInfos.symbol}: {e}")
+            return str(e)
@@ -0,0 +1,143 @@
+import os
+import asyncio
+import logging
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+from typing import Dict, List, Optional, Tuple, Union
+from entities.ArchModels import ArchModelType
+from entities.Distribution import DistributionType
+from schemas.symbol_properties import SymbolProperties
+from services.GarchLevels import GarchLevels
+from services.GarchIncremental import GarchIncremental, GarchState, SQRT2_OV_PI
+from services.Quotations import Quotations
+from services.Executors import RunInProcessPool
+
+logger = logging.getLogger(__name__)
+
+FORECAST_MAX_HORIZON = 1000
+# Caminhos da simulação (EGARCH com h > 1): padrão e limite de sorteios (caminhos x horizonte) em um único lote
+FORECAST_PATHS = int(os.getenv("FORECAST_PATHS", "2000"))
+FORECAST_MAX_DRAWS = int(os.getenv("FORECAST_MAX_DRAWS", "2000000"))
+
+class GarchForecast:
+    @staticmethod
+    def _GarchVariances(state: GarchState, horizon: int) -> np.ndarray:
+        # Forma fechada: sigma2[T+h] = w_bar + (alpha+beta)^(h-1) * (sigma2[T+1] - w_bar)
+        params = state.params
+        persistence = params['alpha[1]'] + params['beta[1]']
+        steps = np.arange(horizon)
+        if persistence >= 1:
+            return state.variance + params['omega'] * steps
+        longRun = params['omega'] / (1 - persistence)
+        return longRun + persistence ** steps * (state.variance - longRun)
+
+    @staticmethod
+    def _FigarchVariances(state: GarchState, horizon: int) -> np.ndarray:
+        # Representação ARCH(inf): os resíduos futuros ao quadrado são substituídos pelas variâncias previstas
+        params = state.params
+        omega_tilde = params['omega'] / (1 - params['beta'])
+        squaredResiduals = state.squaredResiduals.copy()
+        variances = np.empty(horizon)
+        variances[0] = state.variance
+        for h in range(1, horizon):
+            squaredResiduals = np.roll(squaredResiduals, 1)
+            squaredResiduals[0] = variances[h - 1]
+            variances[h] = omega_tilde + float(state.archWeights @ squaredResiduals)
+        return variances
+
+    @staticmethod
+    def _EgarchVariances(state: GarchState, distribution: DistributionType, horizon: int,
+                         paths: int, seed: Optional[int]) -> np.ndarray:
+        # Simulação: todos os choques em um único lote (horizonte-1 x caminhos) e a recursão de
+        # ln sigma2 (AR(1) nos choques) como filtro linear ao longo do horizonte
+        params = state.params
+        rng = np.random.default_rng(seed)
+        shape = (horizon - 1, paths)
+        if distribution == DistributionType.T:
+            nu = params['nu']
+            shocks = rng.standard_t(nu, size=shape) * np.sqrt((nu - 2) / nu)
+        else:
+            shocks = rng.standard_normal(shape)
+
+        inputs = params['omega'] + params['alpha[1]'] * (np.abs(shocks) - SQRT2_OV_PI) + params['gamma[1]'] * shocks
+        logVariance = lfilter([1.0], [1.0, -params['beta[1]']], inputs, axis=0,
+                              zi=np.full((1, paths), params['beta[1]'] * np.log(state.variance)))[0]
+        return np.r_[state.variance, np.exp(logVariance).mean(axis=1)]
+
+    @staticmethod
+    def _Variances(state: GarchState, distribution: DistributionType, horizon: int,
+                   paths: int, seed: Optional[int]) -> Tuple[np.ndarray, str]:
+        if state.modelType == ArchModelType.GARCH:
+            return GarchForecast._GarchVariances(state, horizon), "analytic"
+        if state.modelType == ArchModelType.FIGARCH:
+            return GarchForecast._FigarchVariances(state, horizon), "analytic"
+        if horizon == 1:
+            return np.array([state.variance]), "analytic"
+        return GarchForecast._EgarchVariances(state, distribution, horizon, paths, seed), "simulation"
+
+    @staticmethod
+    def _Bands(df: pd.DataFrame, variances: np.ndarray, multipliers: Tuple[float, ...]) -> pd.DataFrame:
+        # Bandas sobre a abertura da barra em formação com a volatilidade acumulada até cada horizonte
+        volatility = np.sqrt(variances) / 100
+        cumulative = np.sqrt(np.cumsum(variances)) / 100
+        signed = np.repeat(np.asarray(multipliers, dtype=np.float64), 2)
+        signed[1::2] *= -1
+        bands = df['Open'].iloc[-1] * (1 + cumulative[:, None] * signed[None, :])
+
+        forecast = pd.DataFrame({
+            'horizon': np.arange(1, len(variances) + 1),
+            'volatility': volatility,
+            'cumulative_volatility': cumulative,
+        })
+        levels = pd.DataFrame(bands, columns=GarchLevels._LevelColumns(multipliers))
+        return pd.concat([forecast, levels], axis=1)
+
+    @staticmethod
+    def _Validate(horizon: int, paths: int) -> Optional[str]:
+        if horizon <= 0 or horizon > FORECAST_MAX_HORIZON:
+            return f"Horizon must be between 1 and {FORECAST_MAX_HORIZON} bars."
+        if paths <= 0:
+            return "Number of simulation paths must be positive."
+        if paths * (horizon - 1) > FORECAST_MAX_DRAWS:
+            return f"Simulation too large: paths x horizon must not exceed {FORECAST_MAX_DRAWS}."
+        return None
+
+    @staticmethod
+    def Forecast(symbolInfos: SymbolProperties, modelType: ArchModelType, distribution: DistributionType,
+                 horizon: int, levels: int, step: float = 1.0, multipliers: Optional[List[float]] = None,
+                 paths: int = FORECAST_PATHS,
+                 seed: Optional[int] = None) -> Union[Tuple[pd.DataFrame, Dict[str, Union[str, int]]], str]:
+        return asyncio.run(GarchForecast.ForecastAsync(symbolInfos, modelType, distribution, horizon, levels, step,
+                                                       multipliers, paths, seed))
+
+    @staticmethod
+    async def ForecastAsync(symbolInfos: SymbolProperties, modelType: ArchModelType, distribution: DistributionType,
+                            horizon: int, levels: int, step: float = 1.0, multipliers: Optional[List[float]] = None,
+                            paths: int = FORECAST_PATHS,
+                            seed: Optional[int] = None) -> Union[Tuple[pd.DataFrame, Dict[str, Union[str, int]]], str]:
+        try:
+            error = GarchForecast._Validate(horizon, paths)
+            if error is not None:
+                return error
+            multipliers = GarchLevels.LevelMultipliers(levels, step, multipliers)
+            if isinstance(multipliers, str):
+                return multipliers
+
+            df = GarchIncremental._Prepare(symbolInfos, await Quotations().GetAsync(symbolInfos))
+            if isinstance(df, str):
+                return df
+
+            # Mesmo estado (parâmetros e última variância) do modo incremental
+            state = await GarchIncremental.GetStateAsync(symbolInfos, modelType, distribution, df)
+            if isinstance(state, str):
+                return state
+
+            variances, method = await RunInProcessPool(GarchForecast._Variances, state, distribution, horizon, paths, seed)
+            forecast = GarchForecast._Bands(df, variances, multipliers)
+            logger.info(f"Forecasted {horizon} bars of volatility for {symbolInfos.symbol} ({method}).")
+            return forecast, {"method": method, "paths": paths if method == "simulation" else 0}
+
+        except Exception as e:
+            logger.error(f"Error forecasting volatility for {symbolInfos.symbol}: {e}")
+            return str(e)
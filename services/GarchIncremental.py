@@ -0,0 +1,260 @@
+import os
+import time
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from arch.univariate import FIGARCH
+from arch.univariate.recursions import figarch_weights
+from typing import List, NamedTuple, Optional, Tuple, Union
+from entities.ArchModels import ArchModelType
+from entities.Distribution import DistributionType
+from schemas.symbol_properties import SymbolProperties
+from services.GarchLevels import GarchLevels
+from services.Quotations import Quotations
+from services.SingleFlight import SingleFlight
+from services.Executors import RunInProcessPool
+from services.ModelCache import ModelCache
+
+logger = logging.getLogger(__name__)
+
+# Reestimação completa após este número de barras novas (ou segundos desde o último ajuste)
+GARCH_REFIT_BARS = int(os.getenv("GARCH_REFIT_BARS", "26"))
+GARCH_REFIT_SECONDS = float(os.getenv("GARCH_REFIT_SECONDS", "86400"))
+# Cache LRU dos estados guardados (entradas e validade em segundos)
+GARCH_STATE_CACHE_SIZE = int(os.getenv("GARCH_STATE_CACHE_SIZE", "256"))
+GARCH_STATE_CACHE_TTL = float(os.getenv("GARCH_STATE_CACHE_TTL", "86400"))
+FIGARCH_TRUNCATION = 1000
+SQRT2_OV_PI = np.sqrt(2 / np.pi)
+
+class GarchState(NamedTuple):
+    modelType: ArchModelType
+    params: pd.Series
+    lastTimestamp: pd.Timestamp
+    lastClose: float
+    # Variância condicional (escala dos retornos * 100) prevista para a próxima barra
+    variance: float
+    # Volatilidade condicional de cada barra fechada, indexada pelo horário da barra
+    volatility: pd.Series
+    # FIGARCH: pesos ARCH(inf) e resíduos ao quadrado mais recentes ([0] = mais recente)
+    archWeights: Optional[np.ndarray]
+    squaredResiduals: Optional[np.ndarray]
+    barsSinceFit: int
+    fittedAt: float
+
+_states = ModelCache("garch_states", GARCH_STATE_CACHE_SIZE, GARCH_STATE_CACHE_TTL)
+# Serializa a leitura e o avanço de um estado, para que duas requisições não avancem a mesma cópia
+_statesLock = threading.Lock()
+_refitFlight = SingleFlight("garch_incremental")
+
+class GarchIncremental:
+    @staticmethod
+    def _NextVariance(state: GarchState, variance: float, residual: float,
+                      squaredResiduals: Optional[np.ndarray]) -> float:
+        params = state.params
+        if state.modelType == ArchModelType.GARCH:
+            return params['omega'] + params['alpha[1]'] * residual**2 + params['beta[1]'] * variance
+        if state.modelType == ArchModelType.EGARCH:
+            std_residual = residual / np.sqrt(variance)
+            return float(np.exp(
+                params['omega']
+                + params['alpha[1]'] * (abs(std_residual) - SQRT2_OV_PI)
+                + params['gamma[1]'] * std_residual
+                + params['beta[1]'] * np.log(variance)
+            ))
+        omega_tilde = params['omega'] / (1 - params['beta'])
+        return omega_tilde + float(state.archWeights @ squaredResiduals)
+
+    @staticmethod
+    def _Advance(state: GarchState, bars: pd.DataFrame) -> GarchState:
+        # Recursão da variância apenas sobre as barras novas, com os parâmetros congelados
+        closes = np.r_[state.lastClose, bars['Close'].to_numpy(dtype=np.float64)]
+        residuals = (closes[1:] / closes[:-1] - 1) * 100 - state.params['mu']
+        squaredResiduals = state.squaredResiduals.copy() if state.squaredResiduals is not None else None
+        variance = state.variance
+        volatility = np.empty(len(residuals))
+        for i, residual in enumerate(residuals):
+            volatility[i] = np.sqrt(variance) / 100
+            if squaredResiduals is not None:
+                squaredResiduals = np.roll(squaredResiduals, 1)
+                squaredResiduals[0] = residual**2
+            variance = GarchIncremental._NextVariance(state, variance, residual, squaredResiduals)
+
+        return state._replace(
+            lastTimestamp=bars.index[-1],
+            lastClose=closes[-1],
+            variance=variance,
+            volatility=pd.concat([state.volatility, pd.Series(volatility, index=bars.index)]),
+            squaredResiduals=squaredResiduals,
+            barsSinceFit=state.barsSinceFit + len(bars),
+        )
+
+    @staticmethod
+    def _FitState(closed: pd.DataFrame, modelType: ArchModelType, distribution: DistributionType,
+                  startingValues: Optional[np.ndarray] = None) -> Union[GarchState, str]:
+        # Ajuste completo (executado no pool de processos pelo caminho assíncrono)
+        try:
+            fit = GarchLevels._TrainModel(closed, modelType, distribution, startingValues)
+            if isinstance(fit, str):
+                return fit
+
+            archWeights = None
+            squaredResiduals = None
+            if modelType == ArchModelType.FIGARCH:
+                closes = closed['Close'].dropna().to_numpy(dtype=np.float64)
+                residuals = (closes[1:] / closes[:-1] - 1) * 100 - fit.params['mu']
+                archWeights = figarch_weights(fit.params[['phi', 'd', 'beta']].to_numpy(), 1, 1, FIGARCH_TRUNCATION)
+                # Antes do início da amostra o arch usa o backcast no lugar dos resíduos
+                squaredResiduals = np.full(FIGARCH_TRUNCATION, FIGARCH().backcast(residuals))
+                recent = residuals[::-1][:FIGARCH_TRUNCATION] ** 2
+                squaredResiduals[:len(recent)] = recent
+
+            volatility = fit.volatility.to_numpy()
+            return GarchState(
+                modelType=modelType,
+                params=fit.params,
+                lastTimestamp=closed.index[-1],
+                lastClose=float(closed['Close'].iloc[-1]),
+                variance=float((volatility[-1] * 100) ** 2),
+                volatility=pd.Series(volatility[:-1], index=closed.index[-(len(volatility) - 1):]),
+                archWeights=archWeights,
+                squaredResiduals=squaredResiduals,
+                barsSinceFit=0,
+                fittedAt=time.time(),
+            )
+
+        except Exception as e:
+            logger.error(f"Error fitting incremental GARCH state: {e}")
+            return str(e)
+
+    @staticmethod
+    def _NeedsRefit(state: Optional[GarchState], closed: pd.DataFrame) -> bool:
+        return (state is None
+                or state.barsSinceFit >= GARCH_REFIT_BARS
+                or time.time() - state.fittedAt >= GARCH_REFIT_SECONDS
+                or state.lastTimestamp not in closed.index
+                # A janela começa antes da volatilidade guardada: essas barras ficariam sem volatilidade
+                or (len(closed) > 1 and (state.volatility.empty or state.volatility.index[0] > closed.index[1])))
+
+    @staticmethod
+    def _StateKey(symbolInfos: SymbolProperties, modelType: ArchModelType, distribution: DistributionType) -> tuple:
+        # O início da janela faz parte da chave: janelas diferentes têm ajustes (e volatilidades) diferentes
+        return (symbolInfos.symbol.value, symbolInfos.start_date, symbolInfos.granularity.value,
+                modelType.value, distribution.value)
+
+    @staticmethod
+    def _Levels(df: pd.DataFrame, state: GarchState, multipliers: Tuple[float, ...]) -> Union[pd.DataFrame, str]:
+        # Última barra (em formação) recebe a volatilidade prevista, como em GarchLevels
+        volatility = np.r_[state.volatility.reindex(df.index[1:-1]).to_numpy(), np.sqrt(state.variance) / 100]
+        return GarchLevels._CalculateLevels(df, pd.Series(volatility), multipliers)
+
+    @staticmethod
+    def _Prepare(symbolInfos: SymbolProperties, df: Union[pd.DataFrame, str]) -> Union[pd.DataFrame, str]:
+        if isinstance(df, str):
+            return df
+        if len(df) < 3:
+            return f"Not enough bars for {symbolInfos.symbol.value} to fit the model."
+        return df
+
+    @staticmethod
+    def _Update(key: tuple, closed: pd.DataFrame) -> Optional[GarchState]:
+        with _statesLock:
+            state = _states.Get(key)
+            if GarchIncremental._NeedsRefit(state, closed):
+                return None
+            new_bars = closed[closed.index > state.lastTimestamp]
+            if not new_bars.empty:
+                state = GarchIncremental._Advance(state, new_bars)
+                # Só a volatilidade das barras da janela é usada pelos níveis
+                state = state._replace(volatility=state.volatility[state.volatility.index >= closed.index[1]])
+                _states.Put(key, state)
+            return state
+
+    @staticmethod
+    def _Refit(key: tuple, closed: pd.DataFrame, modelType: ArchModelType,
+               distribution: DistributionType) -> Union[GarchState, str]:
+        previous = _states.Get(key)
+        startingValues = previous.params.to_numpy() if previous is not None else None
+        state = GarchIncremental._FitState(closed, modelType, distribution, startingValues)
+        if isinstance(state, str):
+            return state
+        _states.Put(key, state)
+        logger.info(f"Incremental GARCH state refitted for {key}.")
+        return state
+
+    @staticmethod
+    def GetState(symbolInfos: SymbolProperties, modelType: ArchModelType, distribution: DistributionType,
+                 df: pd.DataFrame) -> Union[GarchState, str]:
+        # A última barra ainda está em formação: só as barras fechadas entram na recursão
+        closed = df.iloc[:-1]
+        key = GarchIncremental._StateKey(symbolInfos, modelType, distribution)
+        state = GarchIncremental._Update(key, closed)
+        if state is None:
+            state = _refitFlight.Do(key, GarchIncremental._Refit, key, closed, modelType, distribution)
+        return state
+
+    @staticmethod
+    async def GetStateAsync(symbolInfos: SymbolProperties, modelType: ArchModelType, distribution: DistributionType,
+                            df: pd.DataFrame) -> Union[GarchState, str]:
+        closed = df.iloc[:-1]
+        key = GarchIncremental._StateKey(symbolInfos, modelType, distribution)
+        state = GarchIncremental._Update(key, closed)
+        if state is None:
+            state = await _refitFlight.DoAsync(key, GarchIncremental._RefitAsync, key, closed, modelType, distribution)
+        return state
+
+    @staticmethod
+    def UpdateLevels(symbolInfos: SymbolProperties, modelType: ArchModelType, distribution: DistributionType,
+                     levels: int, step: float = 1.0, multipliers: Optional[List[float]] = None) -> Union[pd.DataFrame, str]:
+        try:
+            multipliers = GarchLevels.LevelMultipliers(levels, step, multipliers)
+            if isinstance(multipliers, str):
+                return multipliers
+
+            df = GarchIncremental._Prepare(symbolInfos, Quotations().Get(symbolInfos))
+            if isinstance(df, str):
+                return df
+
+            state = GarchIncremental.GetState(symbolInfos, modelType, distribution, df)
+            if isinstance(state, str):
+                return state
+
+            return GarchIncremental._Levels(df, state, multipliers)
+
+        except Exception as e:
+            logger.error(f"Error updating volatility levels for {symbolInfos.symbol}: {e}")
+            return str(e)
+
+    @staticmethod
+    async def UpdateLevelsAsync(symbolInfos: SymbolProperties, modelType: ArchModelType, distribution: DistributionType,
+                                levels: int, step: float = 1.0, multipliers: Optional[List[float]] = None) -> Union[pd.DataFrame, str]:
+        try:
+            multipliers = GarchLevels.LevelMultipliers(levels, step, multipliers)
+            if isinstance(multipliers, str):
+                return multipliers
+
+            df = GarchIncremental._Prepare(symbolInfos, await Quotations().GetAsync(symbolInfos))
+            if isinstance(df, str):
+                return df
+
+            state = await GarchIncremental.GetStateAsync(symbolInfos, modelType, distribution, df)
+            if isinstance(state, str):
+                return state
+
+            return GarchIncremental._Levels(df, state, multipliers)
+
+        except Exception as e:
+            logger.error(f"Error updating volatility levels for {symbolInfos.symbol}: {e}")
+            return str(e)
+
+    @staticmethod
+    async def _RefitAsync(key: tuple, closed: pd.DataFrame, modelType: ArchModelType,
+                          distribution: DistributionType) -> Union[GarchState, str]:
+        previous = _states.Get(key)
+        startingValues = previous.params.to_numpy() if previous is not None else None
+        state = await RunInProcessPool(GarchIncremental._FitState, closed, modelType, distribution, startingValues)
+        if isinstance(state, str):
+            return state
+        _states.Put(key, state)
+        logger.info(f"Incremental GARCH state refitted for {key}.")
+        return state
@@ -1,188 +1,624 @@
+import os
+import asyncio
+import hashlib
 import logging
 import numpy as np
 import pandas as pd
 from arch import arch_model
 from arch.univariate import EGARCH
+from scipy.optimize import minimize
+from scipy.signal import lfilter
 from entities.ArchModels import ArchModelType
-from typing import Union, Tuple
+from typing import Dict, List, NamedTuple, Optional, Union, Tuple
 from services.Quotations import Quotations
 from schemas.symbol_properties import SymbolProperties
 from entities.Distribution import DistributionType 
 from entities.Granularity import Granularity
+from entities.SelectionCriterion import SelectionCriterion
+from entities.DecimationMethod import DecimationMethod
+from services.SingleFlight import SingleFlight, PropertiesKey
+from services.Executors import RunInProcessPool, MODEL_WORKERS
+from services.ModelCache import ModelCache
+from services.Decimation import Decimation
 
 logger = logging.getLogger(__name__)
 
+_levelsFlight = SingleFlight("garch_levels")
+_bestFlight = SingleFlight("garch_best")
+
+GARCH_CACHE_SIZE = int(os.getenv("GARCH_CACHE_SIZE", "256"))
+GARCH_CACHE_TTL = float(os.getenv("GARCH_CACHE_TTL", "3600"))
+# Ajustes completos por janela de dados e últimos parâmetros por (símbolo, modelo, distribuição)
+_fitCache = ModelCache("garch_fits", GARCH_CACHE_SIZE, GARCH_CACHE_TTL)
+_paramsCache = ModelCache("garch_params", GARCH_CACHE_SIZE, GARCH_CACHE_TTL)
+# GARCH(1,1) com distribuição normal estimado pelo caminho nativo (lfilter + SLSQP); o arch fica como fallback
+GARCH_FAST_PATH = os.getenv("GARCH_FAST_PATH", "true").lower() == "true"
+GARCH_PARAM_NAMES = ['mu', 'omega', 'alpha[1]', 'beta[1]']
+LOG_2PI = np.log(2 * np.pi)
+# Limite de casas decimais procuradas na precisão dos preços (além disso o float64 não distingue)
+MAX_PRICE_DECIMALS = 15
+
+class GarchFit(NamedTuple):
+    # Volatilidade condicional seguida da previsão de 1 passo, e os parâmetros estimados
+    volatility: pd.Series
+    params: pd.Series
+    loglikelihood: float
+    aic: float
+    bic: float
+
 class GarchLevels:
     @staticmethod
-    def _FIGarchModel(returns: pd.Series, distribution: DistributionType) -> Union[pd.Series, str]:
+    def _FitModel(returns: pd.Series, distribution: DistributionType, startingValues: Optional[np.ndarray], **spec) -> GarchFit:
+        model = arch_model(returns*100, dist=distribution.value, **spec)
         try:
-            model = arch_model(returns*100, vol='FIGARCH', p=1, o=1, q=1, dist=distribution.value)
+            garch_fitted = model.fit(disp='off', starting_values=startingValues)
+        except Exception as e:
+            if startingValues is None:
+                raise
+            # Parâmetros anteriores inválidos para a nova janela: ajuste do zero
+            logger.warning(f"Warm start failed, refitting from scratch: {e}")
             garch_fitted = model.fit(disp='off')
-            volatility = pd.Series(garch_fitted.conditional_volatility/100)
-            predicted = pd.Series(np.sqrt(garch_fitted.forecast(horizon=1).variance.values)[0]/100)
-            volatility = pd.concat([volatility, predicted])
-            logger.info("EGARCH model created successfully.")
-            return volatility
+        volatility = pd.Series(garch_fitted.conditional_volatility/100)
+        predicted = pd.Series(np.sqrt(garch_fitted.forecast(horizon=1).variance.values)[0]/100)
+        volatility = pd.concat([volatility, predicted])
+        volatility.reset_index(inplace=True, drop=True)
+        return GarchFit(volatility, garch_fitted.params, garch_fitted.loglikelihood, garch_fitted.aic, garch_fitted.bic)
+
+    @staticmethod
+    def _Backcast(residuals: np.ndarray) -> float:
+        # Mesma variância inicial do arch: média exponencial (0.94) dos primeiros 75 resíduos ao quadrado
+        tau = min(75, residuals.shape[0])
+        weights = 0.94 ** np.arange(tau)
+        return float(np.sum(residuals[:tau] ** 2 * weights) / weights.sum())
+
+    @staticmethod
+    def _GarchVariance(params: np.ndarray, y: np.ndarray, backcast: float) -> Tuple[np.ndarray, np.ndarray]:
+        # sigma2[t] = omega + alpha*e[t-1]^2 + beta*sigma2[t-1] como filtro linear de primeira ordem
+        mu, omega, alpha, beta = params
+        residuals = y - mu
+        shocks = np.empty_like(residuals)
+        shocks[0] = backcast
+        shocks[1:] = residuals[:-1] ** 2
+        variance = lfilter([1.0], [1.0, -beta], omega + alpha * shocks, zi=[beta * backcast])[0]
+        return variance, residuals
+
+    @staticmethod
+    def _GarchNegLogLikelihood(params: np.ndarray, y: np.ndarray, backcast: float) -> Tuple[float, np.ndarray]:
+        # Log-verossimilhança normal negativa e seu gradiente analítico (derivadas também via lfilter)
+        mu, omega, alpha, beta = params
+        variance, residuals = GarchLevels._GarchVariance(params, y, backcast)
+        if not np.all(variance > 0):
+            return np.inf, np.zeros(4)
+
+        inputs = np.zeros((4, y.shape[0]))
+        inputs[0, 1:] = -2 * alpha * residuals[:-1]
+        inputs[1] = 1.0
+        inputs[2, 0] = backcast
+        inputs[2, 1:] = residuals[:-1] ** 2
+        inputs[3, 0] = backcast
+        inputs[3, 1:] = variance[:-1]
+        derivatives = lfilter([1.0], [1.0, -beta], inputs, axis=1)
+
+        scaled = residuals ** 2 / variance
+        weights = 0.5 * (1 - scaled) / variance
+        gradient = derivatives @ weights
+        gradient[0] -= float(np.sum(residuals / variance))
+        return 0.5 * float(np.sum(LOG_2PI + np.log(variance) + scaled)), gradient
+
+    @staticmethod
+    def _NativeGarchModel(returns: pd.Series, startingValues: Optional[np.ndarray] = None) -> Optional[GarchFit]:
+        # Caminho rápido para GARCH(1,1)-normal; None quando a otimização não converge (usar o arch)
+        y = returns.to_numpy(dtype=np.float64) * 100
+        nobs = y.shape[0]
+        sampleVariance = float(np.var(y))
+        backcast = GarchLevels._Backcast(y - y.mean())
+
+        if startingValues is None:
+            startingValues = np.array([y.mean(), 0.1 * sampleVariance, 0.1, 0.8])
+        bounds = [(-10 * abs(y.mean()) - 1, 10 * abs(y.mean()) + 1), (1e-6 * sampleVariance, 10 * sampleVariance),
+                  (0.0, 1.0), (0.0, 1.0)]
+        constraints = {'type': 'ineq', 'fun': lambda p: np.array([1 - p[2] - p[3]]),
+                       'jac': lambda p: np.array([[0.0, 0.0, -1.0, -1.0]])}
+        result = minimize(GarchLevels._GarchNegLogLikelihood, startingValues, args=(y, backcast),
+                          jac=True, method='SLSQP', bounds=bounds, constraints=constraints,
+                          options={'ftol': 1e-9, 'maxiter': 500})
+        if not result.success or not np.isfinite(result.fun):
+            logger.warning(f"Native GARCH fit did not converge ({result.message}), falling back to arch.")
+            return None
+
+        params = result.x
+        variance, residuals = GarchLevels._GarchVariance(params, y, backcast)
+        forecast = params[1] + params[2] * residuals[-1] ** 2 + params[3] * variance[-1]
+        volatility = pd.Series(np.sqrt(np.r_[variance, forecast]) / 100)
+        loglikelihood = -float(result.fun)
+        k = len(params)
+        return GarchFit(volatility, pd.Series(params, index=GARCH_PARAM_NAMES), loglikelihood,
+                        2 * k - 2 * loglikelihood, k * np.log(nobs) - 2 * loglikelihood)
+
+    @staticmethod
+    def _FIGarchModel(returns: pd.Series, distribution: DistributionType, startingValues: Optional[np.ndarray] = None) -> Union[GarchFit, str]:
+        try:
+            fit = GarchLevels._FitModel(returns, distribution, startingValues, vol='FIGARCH', p=1, o=1, q=1)
+            logger.info("FIGARCH model created successfully.")
+            return fit
 
         except Exception as e:
             logger.error(f"Error creating FIGARCH model: {e}")
             return str(e)
 
     @staticmethod
-    def _EGarchModel(returns: pd.Series, distribution: DistributionType) -> Union[pd.Series, str]:
+    def _EGarchModel(returns: pd.Series, distribution: DistributionType, startingValues: Optional[np.ndarray] = None) -> Union[GarchFit, str]:
         try:
-            model = arch_model(returns*100, vol='EGARCH', p=1, o=1, q=1, dist=distribution.value)
-            garch_fitted = model.fit(disp='off')
-            volatility = pd.Series(garch_fitted.conditional_volatility/100)
-            predicted = pd.Series(np.sqrt(garch_fitted.forecast(horizon=1).variance.values)[0]/100)
-            volatility = pd.concat([volatility, predicted])
+            fit = GarchLevels._FitModel(returns, distribution, startingValues, vol='EGARCH', p=1, o=1, q=1)
             logger.info("EGARCH model created successfully.")
-            return volatility
+            return fit
 
         except Exception as e:
             logger.error(f"Error creating EGARCH model: {e}")
             return str(e)
 
     @staticmethod
-    def _GarchModel(returns: pd.Series, distribution: DistributionType) -> Union[pd.Series, str]:
+    def _GarchModel(returns: pd.Series, distribution: DistributionType, startingValues: Optional[np.ndarray] = None) -> Union[GarchFit, str]:
         try:
-            model = arch_model(returns*100, vol='GARCH', p=1, q=1, dist=distribution.value)
-            garch_fitted = model.fit(disp='off')
-            volatility = pd.Series(garch_fitted.conditional_volatility/100)
-            predicted = pd.Series(np.sqrt(garch_fitted.forecast(horizon=1).variance.values)[0]/100)
-            volatility = pd.concat([volatility, predicted])
-            volatility.reset_index(inplace=True, drop=True)
+            fit = None
+            if GARCH_FAST_PATH and distribution == DistributionType.NORMAL:
+                fit = GarchLevels._NativeGarchModel(returns, startingValues)
+            if fit is None:
+                fit = GarchLevels._FitModel(returns, distribution, startingValues, vol='GARCH', p=1, q=1)
             logger.info("GARCH model created successfully.")
-            return volatility
+            return fit
 
         except Exception as e:
             logger.error(f"Error creating GARCH model: {e}")
             return str(e)
 
     @staticmethod
-    def _TrainModel(df: pd.DataFrame, modelType: ArchModelType, distribution: DistributionType, levels: int) -> Union[pd.Series, str]:
-        df['returns'] = df['Close'].pct_change()
-        df.dropna(inplace=True)
+    def _TrainModel(df: pd.DataFrame, modelType: ArchModelType, distribution: DistributionType,
+                    startingValues: Optional[np.ndarray] = None) -> Union[GarchFit, str]:
+        df = df.assign(returns=df['Close'].pct_change()).dropna()
         if modelType == ArchModelType.GARCH:
-            return GarchLevels._GarchModel(df['returns'], distribution)
+            return GarchLevels._GarchModel(df['returns'], distribution, startingValues)
         elif modelType == ArchModelType.EGARCH:
-            return GarchLevels._EGarchModel(df['returns'], distribution)
+            return GarchLevels._EGarchModel(df['returns'], distribution, startingValues)
         elif modelType == ArchModelType.FIGARCH:
-            return GarchLevels._FIGarchModel(df['returns'], distribution)
+            return GarchLevels._FIGarchModel(df['returns'], distribution, startingValues)
         else:
             logger.error(f"Unknown model type: {modelType}")
             return "Unknown model type"
 
     @staticmethod
-    def _CalculateLevels(df: pd.DataFrame, modelType: ArchModelType, distribution: DistributionType, levels: int) -> Union[pd.DataFrame, str]:
+    def LevelMultipliers(levels: int, step: float = 1.0,
+                         multipliers: Optional[List[float]] = None) -> Union[Tuple[float, ...], str]:
+        # Multiplicadores de sigma das bandas: lista explícita ou levels passos de tamanho step
+        if multipliers:
+            if any(m <= 0 for m in multipliers):
+                return "Level multipliers must be positive."
+            return tuple(sorted(set(float(m) for m in multipliers)))
+        if levels <= 0:
+            logger.error("Levels must be a positive integer.")
+            return "Levels must be a positive integer."
+        if step <= 0:
+            return "Level step must be positive."
+        return tuple(float(level * step) for level in range(1, levels + 1))
+
+    @staticmethod
+    def _LevelColumns(multipliers: Tuple[float, ...]) -> List[str]:
+        columns = []
+        for m in multipliers:
+            columns.append(f'volatility_level_{m:g}')
+            columns.append(f'volatility_level_-{m:g}')
+        return columns
+
+    @staticmethod
+    def DecimateLevels(levels_df: pd.DataFrame, maxPoints: int, method: DecimationMethod,
+                       multipliers: Tuple[float, ...]) -> Union[pd.DataFrame, str]:
+        # minmax mantém as máximas e mínimas do preço, os picos de volatilidade e os dois extremos de cada banda
+        bands = tuple(GarchLevels._LevelColumns(multipliers))
+        return Decimation.Decimate(levels_df, maxPoints, method, highs=('High', 'volatility', *bands),
+                                   lows=('Low', *bands))
+
+    @staticmethod
+    def _CalculateLevels(df: pd.DataFrame, volatility: pd.Series, multipliers: Tuple[float, ...]) -> Union[pd.DataFrame, str]:
         try:
-            if levels <= 0:
-                logger.error("Levels must be a positive integer.")
-                return "Levels must be a positive integer."
-            
-            # Criar uma cópia explícita do DataFrame para evitar SettingWithCopyWarning
-            df = df.copy()
-            
-            # Treinar o modelo com os dados históricos (excluindo as últimas 2 linhas)
-            volatility = GarchLevels._TrainModel(df.iloc[:-1], modelType, distribution, levels)
-            #logger.info(f"{volatility}")
-            if isinstance(volatility, str):
-                return volatility
-            
             df = df[1:]
-            df['Date'] = df.index
-            df.reset_index(inplace=True, drop=True)
-            df['volatility'] = volatility
-            logger.info(f"{df['volatility']}")
-  
-            for level in range(1, levels + 1):
-                col_pos = f'volatility_level_{level}'
-                col_neg = f'volatility_level_-{level}'
-                df[col_pos] = df['Close'] * (1 + level*df['volatility'])
-                df[col_neg] = df['Close'] * (1 - level*df['volatility'])
-                df.loc[df.index[-1], col_pos] = df['Open'].iloc[-1] * (1 + level*df['volatility'].iloc[-1])
-                df.loc[df.index[-1], col_neg] = df['Open'].iloc[-1] * (1 - level*df['volatility'].iloc[-1])
-            
-            df.index = df['Date'] #type: ignore
-            logger.info(f"Calculated {levels} volatility levels successfully.")
+            vol = volatility.to_numpy(dtype=np.float64)
+
+            # Base das bandas: fechamento de cada barra, e abertura na última (barra em formação)
+            base = df['Close'].to_numpy(dtype=np.float64, copy=True)
+            base[-1] = df['Open'].iloc[-1]
+
+            # Matriz (barras x 2*níveis) em um único broadcast: colunas +m, -m para cada multiplicador
+            signed = np.repeat(np.asarray(multipliers, dtype=np.float64), 2)
+            signed[1::2] *= -1
+            bands = base[:, None] * (1 + vol[:, None] * signed[None, :])
+
+            levels_df = pd.DataFrame(bands, columns=GarchLevels._LevelColumns(multipliers), index=df.index)
+            df = pd.concat([
+                df,
+                pd.DataFrame({'Date': df.index, 'volatility': vol}, index=df.index),
+                levels_df
+            ], axis=1)
+            logger.info(f"Calculated {len(multipliers)} volatility levels successfully.")
             return df
         except Exception as e:
             logger.error(f"Error calculating volatility levels: {e}")
             return str(e)
 
 
+    @staticmethod
+    def _DayKeys(index: pd.DatetimeIndex) -> np.ndarray:
+        # Dia no horário local da bolsa (como .date), em inteiros para a junção
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.normalize().as_unit('ns').asi8
+
+    @staticmethod
+    def _PriceDecimals(close: np.ndarray) -> Optional[int]:
+        # Menor número de casas que representa todos os preços exatamente (a menos de 1 ulp)
+        values = close[np.isfinite(close)]
+        if values.size == 0:
+            return None
+        for decimals in range(MAX_PRICE_DECIMALS + 1):
+            exact = np.abs(np.round(values, decimals) - values) <= np.spacing(np.abs(values))
+            values = values[~exact]
+            if values.size == 0:
+                return decimals
+        return None
+
     @staticmethod
     def _MergeDataFrames(df: pd.DataFrame, df_daily: pd.DataFrame) -> Union[pd.DataFrame, str]:
         try:
-            df_copy = df.copy()
-            df_daily_copy = df_daily.copy()
-            
-            df_copy['time'] = pd.to_datetime(df_copy.index).date
-            df_daily_copy['time'] = pd.to_datetime(df_daily_copy.index).date
-
-            df_merged = df_copy.merge(
-                df_daily_copy, 
-                on='time',
-                suffixes=('', '_diary'), 
-                how='left'
-            )
-            
-            df_merged.index = df.index
+            # Junção pelo índice ordenado: posição da barra diária do mesmo dia de cada barra intradiária
+            keys = GarchLevels._DayKeys(df.index)
+            dailyKeys = GarchLevels._DayKeys(df_daily.index)
+            positions = np.searchsorted(dailyKeys, keys)
+            found = positions < len(dailyKeys)
+            found[found] = dailyKeys[positions[found]] == keys[found]
+            positions[~found] = -1
+
+            decimals = GarchLevels._PriceDecimals(df['Close'].to_numpy(dtype=np.float64))
+
+            columns = {}
+            for col in df.columns:
+                values = df[col].to_numpy()
+                if decimals is not None and values.dtype.kind == 'f':
+                    values = np.round(values, decimals)
+                columns[col] = values
+
+            # Coluna 'time' mantida na resposta: objetos date criados só uma vez por dia
+            codes, days = pd.factorize(keys)
+            columns['time'] = pd.to_datetime(days).date[codes]
+
+            for col in df_daily.columns:
+                values = pd.api.extensions.take(df_daily[col].array, positions, allow_fill=True)
+                if isinstance(values, pd.arrays.NumpyExtensionArray):
+                    values = values.to_numpy()
+                    if decimals is not None and values.dtype.kind == 'f':
+                        np.round(values, decimals, out=values)
+                columns[f'{col}_diary' if col in df.columns else col] = values
 
+            df_merged = pd.DataFrame(columns, index=df.index, copy=False)
             logger.info("DataFrames merged successfully.")
             return df_merged
-            
+
         except Exception as e:
             logger.error(f"Error merging DataFrames: {e}")
             return str(e)
-    
+
+    @staticmethod
+    def _DailyProperties(symbolInfos: SymbolProperties) -> SymbolProperties:
+        return symbolInfos.model_copy(update={
+            "granularity": Granularity.ONE_DAY,
+            "start_date": '2023-01-01'
+        })
+
+    @staticmethod
+    def _FitKeys(symbolInfos: SymbolProperties, df_daily: pd.DataFrame, modelType: ArchModelType,
+                 distribution: DistributionType) -> Tuple[tuple, tuple]:
+        # Impressão digital da janela de treino (todas as barras diárias menos a última)
+        window = df_daily.iloc[:-1]
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(window['Close'].to_numpy(dtype=np.float64).tobytes())
+        digest.update(window.index.as_unit('ns').asi8.tobytes())
+        modelKey = (symbolInfos.symbol.value, modelType.value, distribution.value)
+        return modelKey, (*modelKey, digest.hexdigest())
+
+    @staticmethod
+    def _CachedFit(modelKey: tuple, fitKey: tuple) -> Tuple[Optional[GarchFit], Optional[np.ndarray]]:
+        # Acerto exato: reutiliza o ajuste; acerto próximo: parte dos parâmetros do último ajuste
+        fit = _fitCache.Get(fitKey)
+        if fit is not None:
+            return fit, None
+        params = _paramsCache.Get(modelKey)
+        return None, (params.to_numpy() if params is not None else None)
+
     @staticmethod
-    def _FixDecimalPlaces(df: pd.DataFrame) -> Union[pd.DataFrame, str]:
+    def _StoreFit(modelKey: tuple, fitKey: tuple, fit: GarchFit) -> None:
+        _fitCache.Put(fitKey, fit)
+        _paramsCache.Put(modelKey, fit.params)
+
+    @staticmethod
+    def _Compute(df: pd.DataFrame, df_daily: pd.DataFrame, modelType: ArchModelType,
+                 distribution: DistributionType, multipliers: Tuple[float, ...], cachedFit: Optional[GarchFit] = None,
+                 startingValues: Optional[np.ndarray] = None) -> Union[Tuple[pd.DataFrame, GarchFit], str]:
+        # Etapa CPU-bound (ajuste + pós-processamento), executada no pool de processos pelo caminho assíncrono
         try:
-            decimal_places = df['Close'].astype(str).str.split('.').str[1].str.len().max()
+            fit = cachedFit
+            if fit is None:
+                # Treinar o modelo com os dados históricos (excluindo a última linha)
+                fit = GarchLevels._TrainModel(df_daily.iloc[:-1], modelType, distribution, startingValues)
+                if isinstance(fit, str):
+                    return fit
 
-            for col in df.select_dtypes(include=[np.number]).columns:
-                df[col] = df[col].round(decimal_places)
+            df_daily = GarchLevels._CalculateLevels(df_daily, fit.volatility, multipliers)
+            if isinstance(df_daily, str):
+                return df_daily
 
-            logger.info("Decimal places fixed successfully.")
-            return df
+            # Junção com as barras diárias e arredondamento na precisão dos preços, sem cópias intermediárias
+            df_merged = GarchLevels._MergeDataFrames(df, df_daily)
+            if isinstance(df_merged, str):
+                return df_merged
+
+            logger.info("Levels of volatility calculated successfully.")
+            return df_merged, fit
 
         except Exception as e:
-            logger.error(f"Error fixing decimal places: {e}")
+            logger.error(f"Error calculating volatility levels: {e}")
             return str(e)
 
     @staticmethod
     def GetLevels(symbolInfos: SymbolProperties, modelType: ArchModelType, 
-                  distribution: DistributionType, levels: int) -> Union[pd.DataFrame, str]:
+                  distribution: DistributionType, levels: int, step: float = 1.0,
+                  multipliers: Optional[List[float]] = None) -> Union[pd.DataFrame, str]:
+        multipliers = GarchLevels.LevelMultipliers(levels, step, multipliers)
+        if isinstance(multipliers, str):
+            return multipliers
+
+        # Requisições idênticas simultâneas compartilham o mesmo download e ajuste
+        key = (*PropertiesKey(symbolInfos), modelType.value, distribution.value, multipliers)
+        return _levelsFlight.Do(key, GarchLevels._GetLevels, symbolInfos, modelType, distribution, multipliers)
+
+    @staticmethod
+    def _GetLevels(symbolInfos: SymbolProperties, modelType: ArchModelType,
+                   distribution: DistributionType, multipliers: Tuple[float, ...]) -> Union[pd.DataFrame, str]:
         try:
             quotation_service = Quotations()
             df = quotation_service.Get(symbolInfos)
             if isinstance(df, str):
                 return df
 
-            symbolInfos_daily = symbolInfos
-            symbolInfos_daily.granularity = Granularity.ONE_DAY
-            symbolInfos_daily.start_date = '2023-01-01'
-            df_daily = quotation_service.Get(symbolInfos_daily)
-
+            df_daily = quotation_service.Get(GarchLevels._DailyProperties(symbolInfos))
             if isinstance(df_daily, str):
                 return df_daily
 
-            df_daily = GarchLevels._CalculateLevels(df_daily, modelType, distribution, levels)
+            modelKey, fitKey = GarchLevels._FitKeys(symbolInfos, df_daily, modelType, distribution)
+            cachedFit, startingValues = GarchLevels._CachedFit(modelKey, fitKey)
+            result = GarchLevels._Compute(df, df_daily, modelType, distribution, multipliers, cachedFit, startingValues)
+            if isinstance(result, str):
+                return result
+
+            df_merged, fit = result
+            GarchLevels._StoreFit(modelKey, fitKey, fit)
+            return df_merged
+
+        except Exception as e:
+            logger.error(f"Error retrieving quotations: {e}")
+            return str(e)
+
+    @staticmethod
+    async def GetLevelsAsync(symbolInfos: SymbolProperties, modelType: ArchModelType,
+                             distribution: DistributionType, levels: int, step: float = 1.0,
+                             multipliers: Optional[List[float]] = None) -> Union[pd.DataFrame, str]:
+        multipliers = GarchLevels.LevelMultipliers(levels, step, multipliers)
+        if isinstance(multipliers, str):
+            return multipliers
+
+        key = (*PropertiesKey(symbolInfos), modelType.value, distribution.value, multipliers)
+        return await _levelsFlight.DoAsync(key, GarchLevels._GetLevelsAsync, symbolInfos, modelType, distribution, multipliers)
+
+    @staticmethod
+    async def _GetLevelsAsync(symbolInfos: SymbolProperties, modelType: ArchModelType,
+                              distribution: DistributionType, multipliers: Tuple[float, ...]) -> Union[pd.DataFrame, str]:
+        try:
+            # Intradiário e diário são independentes (o diário vem sempre do provider): downloads concorrentes
+            quotation_service = Quotations()
+            df, df_daily = await asyncio.gather(
+                quotation_service.GetAsync(symbolInfos),
+                quotation_service.GetAsync(GarchLevels._DailyProperties(symbolInfos))
+            )
+            if isinstance(df, str):
+                return df
             if isinstance(df_daily, str):
                 return df_daily
 
-            df_merged = GarchLevels._MergeDataFrames(df, df_daily)
-            if isinstance(df_merged, str):
-                return df_merged
-
-            df_merged = GarchLevels._FixDecimalPlaces(df_merged)
-            if isinstance(df_merged, str):
-                return df_merged
+            # O cache fica no processo principal; o worker recebe o ajuste pronto ou os parâmetros iniciais
+            modelKey, fitKey = GarchLevels._FitKeys(symbolInfos, df_daily, modelType, distribution)
+            cachedFit, startingValues = GarchLevels._CachedFit(modelKey, fitKey)
+            result = await RunInProcessPool(GarchLevels._Compute, df, df_daily, modelType, distribution, multipliers,
+                                            cachedFit, startingValues)
+            if isinstance(result, str):
+                return result
 
-            logger.info("Levels of volatility calculated successfully.")
+            df_merged, fit = result
+            GarchLevels._StoreFit(modelKey, fitKey, fit)
             return df_merged
 
         except Exception as e:
             logger.error(f"Error retrieving quotations: {e}")
-            return str(e)
\ No newline at end of file
+            return str(e)
+
+    @staticmethod
+    def _Comparison(fits: Dict[Tuple[ArchModelType, DistributionType], Union[GarchFit, str]],
+                    criterion: SelectionCriterion) -> pd.DataFrame:
+        rows = []
+        for (modelType, distribution), fit in fits.items():
+            failed = isinstance(fit, str)
+            rows.append({
+                "modelType": modelType.value,
+                "distribution": distribution.value,
+                "loglikelihood": np.nan if failed else fit.loglikelihood,
+                "aic": np.nan if failed else fit.aic,
+                "bic": np.nan if failed else fit.bic,
+                "error": fit if failed else None,
+            })
+        comparison = pd.DataFrame(rows)
+        # AIC/BIC: menor é melhor; log-verossimilhança: maior é melhor
+        ascending = criterion != SelectionCriterion.LOGLIKELIHOOD
+        return comparison.sort_values(criterion.value, ascending=ascending, na_position="last").reset_index(drop=True)
+
+    @staticmethod
+    def GetBestLevels(symbolInfos: SymbolProperties, levels: int,
+                      criterion: SelectionCriterion = SelectionCriterion.BIC, step: float = 1.0,
+                      multipliers: Optional[List[float]] = None) -> Union[Tuple[pd.DataFrame, pd.DataFrame], str]:
+        return asyncio.run(GarchLevels.GetBestLevelsAsync(symbolInfos, levels, criterion, step, multipliers))
+
+    @staticmethod
+    async def GetBestLevelsAsync(symbolInfos: SymbolProperties, levels: int,
+                                 criterion: SelectionCriterion = SelectionCriterion.BIC, step: float = 1.0,
+                                 multipliers: Optional[List[float]] = None) -> Union[Tuple[pd.DataFrame, pd.DataFrame], str]:
+        multipliers = GarchLevels.LevelMultipliers(levels, step, multipliers)
+        if isinstance(multipliers, str):
+            return multipliers
+
+        key = (*PropertiesKey(symbolInfos), multipliers, criterion.value)
+        return await _bestFlight.DoAsync(key, GarchLevels._GetBestLevelsAsync, symbolInfos, multipliers, criterion)
+
+    @staticmethod
+    async def _GetBestLevelsAsync(symbolInfos: SymbolProperties, multipliers: Tuple[float, ...],
+                                  criterion: SelectionCriterion) -> Union[Tuple[pd.DataFrame, pd.DataFrame], str]:
+        try:
+            # Intradiário e diário são independentes: downloads concorrentes, como em _GetLevelsAsync
+            quotation_service = Quotations()
+            df, df_daily = await asyncio.gather(
+                quotation_service.GetAsync(symbolInfos),
+                quotation_service.GetAsync(GarchLevels._DailyProperties(symbolInfos))
+            )
+            if isinstance(df, str):
+                return df
+            if isinstance(df_daily, str):
+                return df_daily
+
+            # Todas as combinações modelo x distribuição ajustadas em paralelo no pool de processos
+            combinations = [(modelType, distribution) for modelType in ArchModelType for distribution in DistributionType]
+            keys = {combination: GarchLevels._FitKeys(symbolInfos, df_daily, *combination) for combination in combinations}
+
+            async def fit(combination: Tuple[ArchModelType, DistributionType]) -> Union[GarchFit, str]:
+                modelKey, fitKey = keys[combination]
+                cachedFit, startingValues = GarchLevels._CachedFit(modelKey, fitKey)
+                if cachedFit is not None:
+                    return cachedFit
+                result = await RunInProcessPool(GarchLevels._TrainModel, df_daily.iloc[:-1], *combination, startingValues)
+                if not isinstance(result, str):
+                    GarchLevels._StoreFit(modelKey, fitKey, result)
+                return result
+
+            fits = dict(zip(combinations, await asyncio.gather(*(fit(combination) for combination in combinations))))
+            comparison = GarchLevels._Comparison(fits, criterion)
+            if comparison["error"].notna().all():
+                return f"All model fits failed: {comparison['error'].iloc[0]}"
+
+            best = (ArchModelType(comparison["modelType"].iloc[0]), DistributionType(comparison["distribution"].iloc[0]))
+            result = await RunInProcessPool(GarchLevels._Compute, df, df_daily, *best, multipliers, fits[best])
+            if isinstance(result, str):
+                return result
+
+            df_merged, _ = result
+            logger.info(f"Best model for {symbolInfos.symbol} by {criterion.value}: {best[0].value}/{best[1].value}.")
+            return df_merged, comparison
+
+        except Exception as e:
+            logger.error(f"Error selecting best model for {symbolInfos.symbol}: {e}")
+            return str(e)
+
+    @staticmethod
+    def _FitChunk(closes: np.ndarray, modelType: ArchModelType, distribution: DistributionType,
+                  startingValues: List[Optional[np.ndarray]]) -> List[Union[GarchFit, str]]:
+        # Uma tarefa do pool por bloco de colunas (símbolos) da matriz datas x símbolos
+        fits = []
+        for column, start in zip(closes.T, startingValues):
+            window = pd.DataFrame({'Close': column[~np.isnan(column)]})
+            fits.append(GarchLevels._TrainModel(window, modelType, distribution, start))
+        return fits
+
+    @staticmethod
+    def GetLevelsBatch(symbols: List[SymbolProperties], modelType: ArchModelType, distribution: DistributionType,
+                       levels: int, step: float = 1.0,
+                       multipliers: Optional[List[float]] = None) -> Union[Tuple[pd.DataFrame, Dict[str, str]], str]:
+        return asyncio.run(GarchLevels.GetLevelsBatchAsync(symbols, modelType, distribution, levels, step, multipliers))
+
+    @staticmethod
+    async def GetLevelsBatchAsync(symbols: List[SymbolProperties], modelType: ArchModelType, distribution: DistributionType,
+                                  levels: int, step: float = 1.0,
+                                  multipliers: Optional[List[float]] = None) -> Union[Tuple[pd.DataFrame, Dict[str, str]], str]:
+        try:
+            multipliers = GarchLevels.LevelMultipliers(levels, step, multipliers)
+            if isinstance(multipliers, str):
+                return multipliers
+            duplicates = Quotations.DuplicateSymbols(symbols)
+            if duplicates is not None:
+                return duplicates
+
+            # Downloads concorrentes de todos os símbolos, intradiário e diário
+            quotation_service = Quotations()
+            intraday, daily = await asyncio.gather(
+                quotation_service.GetManyAsync(symbols),
+                quotation_service.GetManyAsync([GarchLevels._DailyProperties(props) for props in symbols])
+            )
+
+            errors: Dict[str, str] = {}
+            fits: Dict[str, GarchFit] = {}
+            pending = []
+            for props in symbols:
+                symbol = props.symbol.value
+                for result in (intraday[symbol], daily[symbol]):
+                    if isinstance(result, str):
+                        errors[symbol] = result
+                        break
+                else:
+                    keys = GarchLevels._FitKeys(props, daily[symbol], modelType, distribution)
+                    cachedFit, startingValues = GarchLevels._CachedFit(*keys)
+                    if cachedFit is not None:
+                        fits[symbol] = cachedFit
+                    else:
+                        pending.append((symbol, keys, startingValues))
+
+            if pending:
+                # Janelas de treino alinhadas em uma matriz datas x símbolos, dividida em blocos entre os workers
+                closes = pd.concat(
+                    {symbol: daily[symbol]['Close'].iloc[:-1] for symbol, _, _ in pending}, axis=1
+                ).sort_index().to_numpy(dtype=np.float64)
+                chunks = np.array_split(np.arange(len(pending)), min(len(pending), max(1, MODEL_WORKERS)))
+                results = await asyncio.gather(*(
+                    RunInProcessPool(GarchLevels._FitChunk, closes[:, chunk], modelType, distribution,
+                                     [pending[i][2] for i in chunk])
+                    for chunk in chunks
+                ))
+                for (symbol, keys, _), fit in zip(pending, (fit for chunk in results for fit in chunk)):
+                    if isinstance(fit, str):
+                        errors[symbol] = fit
+                    else:
+                        GarchLevels._StoreFit(*keys, fit)
+                        fits[symbol] = fit
+
+            # Bandas e junção intradiário/diário também fora do event loop, em paralelo entre os símbolos
+            computed = await asyncio.gather(*(
+                RunInProcessPool(GarchLevels._Compute, intraday[symbol], daily[symbol], modelType, distribution,
+                                 multipliers, fit)
+                for symbol, fit in fits.items()
+            ))
+            frames = {}
+            for symbol, result in zip(fits, computed):
+                if isinstance(result, str):
+                    errors[symbol] = result
+                else:
+                    frames[symbol] = result[0]
+
+            # Formato longo: uma coluna 'symbol' e as mesmas colunas de GetLevels
+            levels_df = (pd.concat(frames, names=['symbol']).reset_index(level='symbol')
+                         if frames else pd.DataFrame(columns=['symbol']))
+            logger.info(f"Calculated volatility levels for {len(frames)} of {len(symbols)} symbols in batch.")
+            return levels_df, errors
+
+        except Exception as e:
+            logger.error(f"Error calculating volatility levels in batch: {e}")
+            return str(e)
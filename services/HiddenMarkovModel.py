@@ -1,55 +1,83 @@
+import os
+import asyncio
+import hashlib
 import logging
 import pandas as pd
 from services.Quotations import Quotations
 from sklearn.preprocessing import StandardScaler
 from hmmlearn import hmm
-from typing import Union, Tuple
+from typing import Dict, List, NamedTuple, Optional, Union, Tuple
+from entities.Feature import Feature
+from services.FeatureEngine import FeatureEngine
 import numpy as np
 from schemas.symbol_properties import SymbolProperties
+from services.SingleFlight import SingleFlight, PropertiesKey
+from services.Executors import RunInProcessPool, MODEL_WORKERS
+from services.ModelCache import ModelCache
+from entities.SelectionCriterion import SelectionCriterion
 
 logger = logging.getLogger(__name__)
 
+_regimesFlight = SingleFlight("markov_regimes")
+_bestFlight = SingleFlight("markov_regimes_best")
+
+# Features padrão do modelo; volatility_21 também ordena os regimes (0 = menor volatilidade média)
+HMM_FEATURES = ('volatility_21', 'price_range', 'atr_14')
+REGIME_ORDER_FEATURE = 'volatility_21'
+HMM_CACHE_SIZE = int(os.getenv("HMM_CACHE_SIZE", "128"))
+HMM_CACHE_TTL = float(os.getenv("HMM_CACHE_TTL", "3600"))
+# Regimes decodificados por janela de dados e últimos parâmetros por (símbolo, granularidade, K, features)
+_regimesCache = ModelCache("hmm_regimes", HMM_CACHE_SIZE, HMM_CACHE_TTL)
+_hmmParamsCache = ModelCache("hmm_params", HMM_CACHE_SIZE, HMM_CACHE_TTL)
+# Seleção de modelo: reinícios aleatórios do EM por K (sementes 42, 43, ...) e limite de ajustes por requisição
+HMM_RESTARTS = int(os.getenv("HMM_RESTARTS", "4"))
+HMM_MAX_CANDIDATES = int(os.getenv("HMM_MAX_CANDIDATES", "32"))
+HMM_RANDOM_STATE = 42
+
+class HmmFit(NamedTuple):
+    startprob: np.ndarray
+    transmat: np.ndarray
+    means: np.ndarray
+    covars: np.ndarray
+    iterations: int
+    loglikelihood: float
+    converged: bool
+    warmStart: bool
+    # Tamanho e impressão digital da janela ajustada, para reconhecer uma janela que apenas cresceu
+    rows: int
+    windowDigest: str
+
+class HmmCandidate(NamedTuple):
+    n_regimes: int
+    randomState: int
+    fit: HmmFit
+    aic: float
+    bic: float
+
 class HiddenMarkovModel:    
     @staticmethod
-    def _Features(df: pd.DataFrame) -> Union[pd.DataFrame, str]:
-        try:
-            df = df.copy()
-            df['returns'] = df['Close'].pct_change()
-
-            # Volatilidade realizada (janelas diferentes)
-            df['volatility_5'] = df['returns'].rolling(5).std()
-            df['volatility_21'] = df['returns'].rolling(21).std()
-            df['volatility_63'] = df['returns'].rolling(63).std()
-
-            # Range de preço (High-Low normalizado)
-            df['price_range'] = (df['High'] - df['Low']) / df['Close']
-
-            # Volume normalizado
-            df['volume_norm'] = df['Volume'] / df['Volume'].rolling(21).mean()
-
-            # ATR (Average True Range)
-            df['tr'] = np.maximum(
-                df['High'] - df['Low'],
-                np.maximum(
-                    abs(df['High'] - df['Close'].shift(1)),
-                    abs(df['Low'] - df['Close'].shift(1))
-                )
-            )
-            df['atr_14'] = df['tr'].rolling(14).mean()
+    def _ModelFeatures(features: Optional[List[Feature]]) -> Union[Tuple[str, ...], str]:
+        if not features:
+            return HMM_FEATURES
+        names = tuple(dict.fromkeys(str(feature) for feature in features))
+        resolved = FeatureEngine.Resolve(names)
+        return resolved if isinstance(resolved, str) else names
 
-            # Remover NaNs iniciais
-            data = df.dropna()
-            logger.info(f"Features calculated successfully.")
-            return data
-        
-        except Exception as e:
-            logger.error(f"Error calculating features: {e}")
-            return str(e)
+    @staticmethod
+    def _Features(df: pd.DataFrame, features: Tuple[str, ...] = HMM_FEATURES) -> Union[Tuple[pd.DataFrame, np.ndarray], str]:
+        # Só as features do modelo (e suas dependências) são calculadas; a matriz vai direto ao scaler
+        computed = features if REGIME_ORDER_FEATURE in features else (*features, REGIME_ORDER_FEATURE)
+        result = FeatureEngine.Compute(df, computed)
+        if isinstance(result, str):
+            return result
+        data, matrix = result
+        if computed is not features:
+            matrix = np.ascontiguousarray(matrix[:, :len(features)])
+        return data, matrix
 
     @staticmethod
-    def _Normalization(df: pd.DataFrame) -> Union[Tuple[StandardScaler, np.ndarray], str]:
+    def _Normalization(features: np.ndarray) -> Union[Tuple[StandardScaler, np.ndarray], str]:
         try:
-            features = df[['volatility_21', 'price_range', 'atr_14']].values
             scaler = StandardScaler()
             features_scaled = scaler.fit_transform(features)
             logger.info("Features normalized successfully.")
@@ -60,16 +88,37 @@ class HiddenMarkovModel:
             return str(e)
 
     @staticmethod
-    def _ModelTrain(features_scaled: np.ndarray, n_regimes: int) -> Union[hmm.GaussianHMM, str]:
+    def _ModelTrain(features_scaled: np.ndarray, n_regimes: int, initFit: Optional[HmmFit] = None,
+                    randomState: int = HMM_RANDOM_STATE) -> Union[hmm.GaussianHMM, str]:
         try:
+            if initFit is not None:
+                # Warm start: EM parte dos parâmetros do ajuste anterior (init_params="" não reinicializa nada)
+                model = hmm.GaussianHMM(
+                    n_components=n_regimes,
+                    covariance_type="full",
+                    n_iter=1000,
+                    random_state=randomState,
+                    init_params=""
+                )
+                model.startprob_ = initFit.startprob
+                model.transmat_ = initFit.transmat
+                model.means_ = initFit.means
+                model.covars_ = initFit.covars
+                try:
+                    model.fit(features_scaled)
+                    logger.info(f"HMM model trained from previous parameters in {model.monitor_.iter} iterations.")
+                    return model
+                except Exception as e:
+                    logger.warning(f"Warm start failed, training HMM from scratch: {e}")
+
             model = hmm.GaussianHMM(
                 n_components=n_regimes,
                 covariance_type="full",
                 n_iter=1000,
-                random_state=42
+                random_state=randomState
             )
             model.fit(features_scaled)
-            logger.info("HMM model trained successfully.")
+            logger.info(f"HMM model trained successfully in {model.monitor_.iter} iterations.")
             return model
 
         except Exception as e:
@@ -91,7 +140,7 @@ class HiddenMarkovModel:
     def _RegimeMapping(regime_raw: np.ndarray, data: pd.DataFrame) -> Union[pd.DataFrame, str]:
         try:
             data['regime_raw'] = regime_raw
-            means = data.groupby('regime_raw')['volatility_21'].mean().sort_values()
+            means = data.groupby('regime_raw')[REGIME_ORDER_FEATURE].mean().sort_values()
             regime_mapping = {old: new for new, old in enumerate(means.index)}
             data['regime'] = data['regime_raw'].map(regime_mapping).astype(int)
             logger.info("Regime mapping created successfully.")
@@ -102,28 +151,75 @@ class HiddenMarkovModel:
             return str(e)
 
     @staticmethod
-    def GetRegimes(symbolInfos: SymbolProperties, n_regimes: int) -> Union[str, pd.DataFrame]:
-        try:
-            data = Quotations().Get(symbolInfos)
-            if isinstance(data, str):
-                return data
+    def _WindowDigest(data: pd.DataFrame) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        for column in ('High', 'Low', 'Close', 'Volume'):
+            digest.update(data[column].to_numpy(dtype=np.float64).tobytes())
+        digest.update(data.index.as_unit('ns').asi8.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _CacheKeys(symbolInfos: SymbolProperties, data: pd.DataFrame, n_regimes: int,
+                   features: Tuple[str, ...] = HMM_FEATURES, windowDigest: Optional[str] = None) -> Tuple[tuple, tuple]:
+        modelKey = (symbolInfos.symbol.value, symbolInfos.granularity.value, n_regimes, features)
+        return modelKey, (*modelKey, windowDigest or HiddenMarkovModel._WindowDigest(data))
+
+    @staticmethod
+    def _CachedRegimes(modelKey: tuple, fitKey: tuple,
+                       data: pd.DataFrame) -> Tuple[Optional[pd.DataFrame], Optional[HmmFit]]:
+        # Acerto exato: regimes já decodificados; janela que só cresceu: parâmetros anteriores para o EM
+        regimes = _regimesCache.Get(fitKey)
+        if regimes is not None:
+            return regimes, None
+        previous = _hmmParamsCache.Get(modelKey)
+        if previous is None or len(data) < previous.rows:
+            return None, None
+        if HiddenMarkovModel._WindowDigest(data.iloc[:previous.rows]) != previous.windowDigest:
+            return None, None
+        return None, previous
+
+    @staticmethod
+    def _StoreRegimes(modelKey: tuple, fitKey: tuple, regimes: pd.DataFrame, fit: HmmFit) -> None:
+        _regimesCache.Put(fitKey, regimes)
+        _hmmParamsCache.Put(modelKey, fit)
+
+    @staticmethod
+    def _FitSummary(model: hmm.GaussianHMM, rows: int, windowDigest: str, warmStart: bool) -> HmmFit:
+        return HmmFit(
+            startprob=model.startprob_,
+            transmat=model.transmat_,
+            means=model.means_,
+            covars=model.covars_,
+            iterations=int(model.monitor_.iter),
+            loglikelihood=float(model.monitor_.history[-1]),
+            converged=bool(model.monitor_.converged),
+            warmStart=warmStart,
+            rows=rows,
+            windowDigest=windowDigest,
+        )
 
-            features_df = HiddenMarkovModel._Features(data)
-            if isinstance(features_df, str):
-                return features_df
+    @staticmethod
+    def _Compute(data: pd.DataFrame, n_regimes: int, initFit: Optional[HmmFit] = None,
+                 features: Tuple[str, ...] = HMM_FEATURES) -> Union[str, Tuple[pd.DataFrame, HmmFit]]:
+        # Etapa CPU-bound (features + EM + Viterbi), executada no pool de processos pelo caminho assíncrono
+        try:
+            featuresResult = HiddenMarkovModel._Features(data, features)
+            if isinstance(featuresResult, str):
+                return featuresResult
+            features_df, matrix = featuresResult
 
-            normalizationResult  = HiddenMarkovModel._Normalization(features_df)
+            normalizationResult  = HiddenMarkovModel._Normalization(matrix)
             if isinstance(normalizationResult, str):
                 return normalizationResult
 
             scaler, normalized = normalizationResult
-            model = HiddenMarkovModel._ModelTrain(normalized, n_regimes)
+            model = HiddenMarkovModel._ModelTrain(normalized, n_regimes, initFit)
             if isinstance(model, str):
                 return model
 
-            if isinstance(model, str):
-                return model
-            
+            fit = HiddenMarkovModel._FitSummary(model, len(data), HiddenMarkovModel._WindowDigest(data),
+                                                initFit is not None and model.init_params == "")
+
             regimes = HiddenMarkovModel._ModelPredict(normalized, model)
             if isinstance(regimes, str):
                 return regimes
@@ -132,10 +228,347 @@ class HiddenMarkovModel:
             regime_mapped_df = HiddenMarkovModel._RegimeMapping(regimes, features_df)
             if isinstance(regime_mapped_df, str):
                 return regime_mapped_df
-            
+
+            return regime_mapped_df, fit
+
+        except Exception as e:
+            logger.error(f"Error during HMM analysis: {e}")
+            return str(e)
+
+    @staticmethod
+    def _Finish(symbolInfos: SymbolProperties, modelKey: tuple, fitKey: tuple,
+                regime_mapped_df: pd.DataFrame, fit: HmmFit) -> pd.DataFrame:
+        # Diagnóstico do ajuste acompanha o DataFrame (exposto pelo endpoint)
+        regime_mapped_df.attrs["fit"] = {
+            "iterations": fit.iterations,
+            "loglikelihood": fit.loglikelihood,
+            "converged": fit.converged,
+            "warm_start": fit.warmStart,
+        }
+        logger.info(f"HMM fit for {symbolInfos.symbol}: {fit.iterations} iterations, "
+                    f"log-likelihood {fit.loglikelihood:.4f}, warm start {fit.warmStart}.")
+        HiddenMarkovModel._StoreRegimes(modelKey, fitKey, regime_mapped_df, fit)
+        return regime_mapped_df
+
+    @staticmethod
+    def GetRegimes(symbolInfos: SymbolProperties, n_regimes: int,
+                   features: Optional[List[Feature]] = None) -> Union[str, pd.DataFrame]:
+        features = HiddenMarkovModel._ModelFeatures(features)
+        if isinstance(features, str):
+            return features
+
+        # Requisições idênticas simultâneas compartilham o mesmo download e ajuste
+        key = (*PropertiesKey(symbolInfos), n_regimes, features)
+        return _regimesFlight.Do(key, HiddenMarkovModel._GetRegimes, symbolInfos, n_regimes, features)
+
+    @staticmethod
+    def _GetRegimes(symbolInfos: SymbolProperties, n_regimes: int, features: Tuple[str, ...]) -> Union[str, pd.DataFrame]:
+        try:
+            data = Quotations().Get(symbolInfos)
+            if isinstance(data, str):
+                return data
+
+            modelKey, fitKey = HiddenMarkovModel._CacheKeys(symbolInfos, data, n_regimes, features)
+            cached, initFit = HiddenMarkovModel._CachedRegimes(modelKey, fitKey, data)
+            if cached is not None:
+                logger.info(f"HMM regimes for {symbolInfos.symbol} served from cache.")
+                return cached
+
+            result = HiddenMarkovModel._Compute(data, n_regimes, initFit, features)
+            if isinstance(result, str):
+                return result
+
+            regime_mapped_df = HiddenMarkovModel._Finish(symbolInfos, modelKey, fitKey, *result)
+            logger.info(f"HMM analysis completed successfully for {symbolInfos.symbol}.")
+            return regime_mapped_df
+
+        except Exception as e:
+            logger.error(f"Error during HMM analysis for {symbolInfos.symbol}: {e}")
+            return str(e)
+
+    @staticmethod
+    async def GetRegimesAsync(symbolInfos: SymbolProperties, n_regimes: int,
+                              features: Optional[List[Feature]] = None) -> Union[str, pd.DataFrame]:
+        features = HiddenMarkovModel._ModelFeatures(features)
+        if isinstance(features, str):
+            return features
+
+        key = (*PropertiesKey(symbolInfos), n_regimes, features)
+        return await _regimesFlight.DoAsync(key, HiddenMarkovModel._GetRegimesAsync, symbolInfos, n_regimes, features)
+
+    @staticmethod
+    async def _GetRegimesAsync(symbolInfos: SymbolProperties, n_regimes: int,
+                               features: Tuple[str, ...]) -> Union[str, pd.DataFrame]:
+        try:
+            data = await Quotations().GetAsync(symbolInfos)
+            if isinstance(data, str):
+                return data
+
+            # Cache consultado e atualizado no processo principal; o pool só executa o ajuste
+            modelKey, fitKey = HiddenMarkovModel._CacheKeys(symbolInfos, data, n_regimes, features)
+            cached, initFit = HiddenMarkovModel._CachedRegimes(modelKey, fitKey, data)
+            if cached is not None:
+                logger.info(f"HMM regimes for {symbolInfos.symbol} served from cache.")
+                return cached
+
+            result = await RunInProcessPool(HiddenMarkovModel._Compute, data, n_regimes, initFit, features)
+            if isinstance(result, str):
+                return result
+
+            regime_mapped_df = HiddenMarkovModel._Finish(symbolInfos, modelKey, fitKey, *result)
             logger.info(f"HMM analysis completed successfully for {symbolInfos.symbol}.")
             return regime_mapped_df
 
         except Exception as e:
             logger.error(f"Error during HMM analysis for {symbolInfos.symbol}: {e}")
             return str(e)
+
+    @staticmethod
+    def _FitCandidate(features_scaled: np.ndarray, rows: int, windowDigest: str, n_regimes: int,
+                      randomState: int) -> Union[HmmCandidate, str]:
+        # Um reinício do EM (uma tarefa do pool); AIC/BIC calculados com os parâmetros finais.
+        # Só a matriz normalizada vai ao pool: a impressão digital da janela é calculada uma vez no processo principal
+        try:
+            model = HiddenMarkovModel._ModelTrain(features_scaled, n_regimes, randomState=randomState)
+            if isinstance(model, str):
+                return model
+            return HmmCandidate(
+                n_regimes=n_regimes,
+                randomState=randomState,
+                fit=HiddenMarkovModel._FitSummary(model, rows, windowDigest, False)._replace(
+                    loglikelihood=float(model.score(features_scaled))),
+                aic=float(model.aic(features_scaled)),
+                bic=float(model.bic(features_scaled)),
+            )
+
+        except Exception as e:
+            logger.error(f"Error fitting HMM candidate (K={n_regimes}, seed={randomState}): {e}")
+            return str(e)
+
+    @staticmethod
+    def _SelectionInputs(data: pd.DataFrame,
+                         features: Tuple[str, ...]) -> Union[Tuple[pd.DataFrame, np.ndarray, str], str]:
+        # Features, normalização e impressão digital da janela, calculadas uma vez para todos os candidatos
+        featuresResult = HiddenMarkovModel._Features(data, features)
+        if isinstance(featuresResult, str):
+            return featuresResult
+        features_df, matrix = featuresResult
+
+        normalizationResult = HiddenMarkovModel._Normalization(matrix)
+        if isinstance(normalizationResult, str):
+            return normalizationResult
+        _, normalized = normalizationResult
+        return features_df, normalized, HiddenMarkovModel._WindowDigest(data)
+
+    @staticmethod
+    def _Decode(features_df: pd.DataFrame, normalized: np.ndarray, fit: HmmFit) -> Union[pd.DataFrame, str]:
+        # Viterbi com os parâmetros do candidato vencedor e mapeamento dos regimes pela volatilidade
+        regimes = HiddenMarkovModel._ModelPredict(normalized, HiddenMarkovModel._ModelFromFit(fit))
+        if isinstance(regimes, str):
+            return regimes
+        return HiddenMarkovModel._RegimeMapping(regimes, features_df)
+
+    @staticmethod
+    def _ModelFromFit(fit: HmmFit) -> hmm.GaussianHMM:
+        model = hmm.GaussianHMM(n_components=len(fit.startprob), covariance_type="full", init_params="")
+        model.startprob_ = fit.startprob
+        model.transmat_ = fit.transmat
+        model.means_ = fit.means
+        model.covars_ = fit.covars
+        return model
+
+    @staticmethod
+    def _Comparison(candidates: Dict[Tuple[int, int], Union[HmmCandidate, str]],
+                    criterion: SelectionCriterion) -> pd.DataFrame:
+        rows = []
+        for (n_regimes, randomState), candidate in candidates.items():
+            failed = isinstance(candidate, str)
+            rows.append({
+                "n_regimes": n_regimes,
+                "random_state": randomState,
+                "loglikelihood": np.nan if failed else candidate.fit.loglikelihood,
+                "aic": np.nan if failed else candidate.aic,
+                "bic": np.nan if failed else candidate.bic,
+                "iterations": None if failed else candidate.fit.iterations,
+                "converged": None if failed else candidate.fit.converged,
+                "error": candidate if failed else None,
+            })
+        comparison = pd.DataFrame(rows)
+        # AIC/BIC: menor é melhor; log-verossimilhança: maior é melhor (entre reinícios do mesmo K os três concordam)
+        ascending = criterion != SelectionCriterion.LOGLIKELIHOOD
+        return comparison.sort_values(criterion.value, ascending=ascending, na_position="last").reset_index(drop=True)
+
+    @staticmethod
+    def _ValidateSelection(min_regimes: int, max_regimes: int, restarts: int) -> Optional[str]:
+        if min_regimes <= 0 or max_regimes < min_regimes:
+            return "Regime range must satisfy 1 <= min_regimes <= max_regimes."
+        if restarts <= 0:
+            return "Number of restarts must be positive."
+        if (max_regimes - min_regimes + 1) * restarts > HMM_MAX_CANDIDATES:
+            return f"Too many fits: (max_regimes - min_regimes + 1) x restarts must not exceed {HMM_MAX_CANDIDATES}."
+        return None
+
+    @staticmethod
+    def GetBestRegimes(symbolInfos: SymbolProperties, min_regimes: int, max_regimes: int,
+                       restarts: int = HMM_RESTARTS, criterion: SelectionCriterion = SelectionCriterion.BIC,
+                       features: Optional[List[Feature]] = None) -> Union[Tuple[pd.DataFrame, pd.DataFrame], str]:
+        return asyncio.run(HiddenMarkovModel.GetBestRegimesAsync(symbolInfos, min_regimes, max_regimes, restarts,
+                                                                 criterion, features))
+
+    @staticmethod
+    async def GetBestRegimesAsync(symbolInfos: SymbolProperties, min_regimes: int, max_regimes: int,
+                                  restarts: int = HMM_RESTARTS, criterion: SelectionCriterion = SelectionCriterion.BIC,
+                                  features: Optional[List[Feature]] = None) -> Union[Tuple[pd.DataFrame, pd.DataFrame], str]:
+        error = HiddenMarkovModel._ValidateSelection(min_regimes, max_regimes, restarts)
+        if error is not None:
+            return error
+        features = HiddenMarkovModel._ModelFeatures(features)
+        if isinstance(features, str):
+            return features
+
+        key = (*PropertiesKey(symbolInfos), min_regimes, max_regimes, restarts, criterion.value, features)
+        return await _bestFlight.DoAsync(key, HiddenMarkovModel._GetBestRegimesAsync, symbolInfos,
+                                         min_regimes, max_regimes, restarts, criterion, features)
+
+    @staticmethod
+    async def _GetBestRegimesAsync(symbolInfos: SymbolProperties, min_regimes: int, max_regimes: int,
+                                   restarts: int, criterion: SelectionCriterion,
+                                   features: Tuple[str, ...]) -> Union[Tuple[pd.DataFrame, pd.DataFrame], str]:
+        try:
+            data = await Quotations().GetAsync(symbolInfos)
+            if isinstance(data, str):
+                return data
+
+            # Etapas fora do pool rodam em uma thread, sem bloquear o event loop
+            inputs = await asyncio.to_thread(HiddenMarkovModel._SelectionInputs, data, features)
+            if isinstance(inputs, str):
+                return inputs
+            features_df, normalized, windowDigest = inputs
+
+            # Todos os pares (K, semente) ajustados em paralelo no pool de processos
+            combinations = [(n_regimes, HMM_RANDOM_STATE + restart)
+                            for n_regimes in range(min_regimes, max_regimes + 1) for restart in range(restarts)]
+            candidates = dict(zip(combinations, await asyncio.gather(*(
+                RunInProcessPool(HiddenMarkovModel._FitCandidate, normalized, len(data), windowDigest, *combination)
+                for combination in combinations
+            ))))
+
+            comparison = HiddenMarkovModel._Comparison(candidates, criterion)
+            if comparison["error"].notna().all():
+                return f"All HMM fits failed: {comparison['error'].iloc[0]}"
+
+            best = candidates[(int(comparison["n_regimes"].iloc[0]), int(comparison["random_state"].iloc[0]))]
+            regime_mapped_df = await asyncio.to_thread(HiddenMarkovModel._Decode, features_df, normalized, best.fit)
+            if isinstance(regime_mapped_df, str):
+                return regime_mapped_df
+
+            # O vencedor alimenta o cache do modo simples (mesma janela e K)
+            modelKey, fitKey = HiddenMarkovModel._CacheKeys(symbolInfos, data, best.n_regimes, features, windowDigest)
+            regime_mapped_df = HiddenMarkovModel._Finish(symbolInfos, modelKey, fitKey, regime_mapped_df, best.fit)
+            logger.info(f"Best HMM for {symbolInfos.symbol} by {criterion.value}: "
+                        f"K={best.n_regimes}, seed {best.randomState} ({len(combinations)} fits).")
+            return regime_mapped_df, comparison
+
+        except Exception as e:
+            logger.error(f"Error selecting HMM for {symbolInfos.symbol}: {e}")
+            return str(e)
+
+    @staticmethod
+    def _ComputeChunk(tasks: List[Tuple[pd.DataFrame, int, Optional[HmmFit]]],
+                      features: Tuple[str, ...]) -> List[Union[str, Tuple[pd.DataFrame, HmmFit]]]:
+        # Uma tarefa do pool por bloco de pares (símbolo, K)
+        return [HiddenMarkovModel._Compute(data, n_regimes, initFit, features) for data, n_regimes, initFit in tasks]
+
+    @staticmethod
+    def _Summary(symbol: str, n_regimes: int, regimes: pd.DataFrame) -> Dict[str, object]:
+        # Resumo compacto: regime atual, há quantas barras ele dura e o diagnóstico do ajuste
+        regime = regimes['regime'].to_numpy()
+        changes = np.flatnonzero(regime != regime[-1])
+        run = len(regime) - (changes[-1] + 1 if len(changes) else 0)
+        fit = regimes.attrs.get("fit", {})
+        return {
+            "symbol": symbol,
+            "n_regimes": n_regimes,
+            "timestamp": regimes.index[-1],
+            "regime": int(regime[-1]),
+            "regime_bars": int(run),
+            "regime_since": regimes.index[-run],
+            "regime_share": float((regime == regime[-1]).mean()),
+            "volatility_21": float(regimes[REGIME_ORDER_FEATURE].iloc[-1]),
+            "bars": len(regimes),
+            "iterations": fit.get("iterations"),
+            "loglikelihood": fit.get("loglikelihood"),
+            "converged": fit.get("converged"),
+            "warm_start": fit.get("warm_start"),
+        }
+
+    @staticmethod
+    def GetRegimesBatch(symbols: List[SymbolProperties], n_regimes: List[int], features: Optional[List[Feature]] = None,
+                        series: bool = False) -> Union[Tuple[pd.DataFrame, Optional[pd.DataFrame], Dict[str, str]], str]:
+        return asyncio.run(HiddenMarkovModel.GetRegimesBatchAsync(symbols, n_regimes, features, series))
+
+    @staticmethod
+    async def GetRegimesBatchAsync(symbols: List[SymbolProperties], n_regimes: List[int], features: Optional[List[Feature]] = None,
+                                   series: bool = False) -> Union[Tuple[pd.DataFrame, Optional[pd.DataFrame], Dict[str, str]], str]:
+        try:
+            if not n_regimes or min(n_regimes) <= 0:
+                return "Number of regimes must be a list of positive integers."
+            n_regimes = sorted(set(n_regimes))
+            features = HiddenMarkovModel._ModelFeatures(features)
+            if isinstance(features, str):
+                return features
+            duplicates = Quotations.DuplicateSymbols(symbols)
+            if duplicates is not None:
+                return duplicates
+
+            # Downloads concorrentes de todos os símbolos, uma única vez para todos os K
+            data = await Quotations().GetManyAsync(symbols)
+
+            errors: Dict[str, str] = {}
+            results: Dict[Tuple[str, int], pd.DataFrame] = {}
+            pending = []
+            for props in symbols:
+                symbol = props.symbol.value
+                if isinstance(data[symbol], str):
+                    errors[symbol] = data[symbol]
+                    continue
+                for k in n_regimes:
+                    modelKey, fitKey = HiddenMarkovModel._CacheKeys(props, data[symbol], k, features)
+                    cached, initFit = HiddenMarkovModel._CachedRegimes(modelKey, fitKey, data[symbol])
+                    if cached is not None:
+                        results[(symbol, k)] = cached
+                    else:
+                        pending.append((props, k, modelKey, fitKey, initFit))
+
+            fromCache = len(results)
+            if pending:
+                # Ajustes (símbolo, K) divididos em blocos entre os workers do pool
+                chunks = np.array_split(np.arange(len(pending)), min(len(pending), max(1, MODEL_WORKERS)))
+                computed = await asyncio.gather(*(
+                    RunInProcessPool(HiddenMarkovModel._ComputeChunk,
+                                     [(data[pending[i][0].symbol.value], pending[i][1], pending[i][4]) for i in chunk],
+                                     features)
+                    for chunk in chunks
+                ))
+                for (props, k, modelKey, fitKey, _), result in zip(pending, (result for chunk in computed for result in chunk)):
+                    symbol = props.symbol.value
+                    if isinstance(result, str):
+                        errors[f"{symbol}:{k}"] = result
+                    else:
+                        results[(symbol, k)] = HiddenMarkovModel._Finish(props, modelKey, fitKey, *result)
+
+            summary = pd.DataFrame([HiddenMarkovModel._Summary(symbol, k, regimes) for (symbol, k), regimes in results.items()])
+            if not summary.empty:
+                summary = summary.sort_values(['symbol', 'n_regimes']).reset_index(drop=True)
+
+            # Séries completas só quando pedidas, em formato longo (colunas symbol e n_regimes)
+            regimes_df = None
+            if series and results:
+                regimes_df = pd.concat(results, names=['symbol', 'n_regimes']).reset_index(level=['symbol', 'n_regimes'])
+
+            logger.info(f"Calculated HMM regimes for {len(results)} (symbol, K) pairs in batch ({fromCache} from cache).")
+            return summary, regimes_df, errors
+
+        except Exception as e:
+            logger.error(f"Error calculating HMM regimes in batch: {e}")
+            return str(e)
@@ -0,0 +1,270 @@
+import os
+import time
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from scipy.special import logsumexp
+from sklearn.preprocessing import StandardScaler
+from typing import List, NamedTuple, Optional, Tuple, Union
+from schemas.symbol_properties import SymbolProperties
+from services.HiddenMarkovModel import HiddenMarkovModel, HmmFit, HMM_FEATURES
+from services.Quotations import Quotations
+from services.SingleFlight import SingleFlight
+from services.Executors import RunInProcessPool
+from services.ModelCache import ModelCache
+
+logger = logging.getLogger(__name__)
+
+# Reestimação completa após este número de barras novas (ou segundos desde o último ajuste)
+HMM_REFIT_BARS = int(os.getenv("HMM_REFIT_BARS", "21"))
+HMM_REFIT_SECONDS = float(os.getenv("HMM_REFIT_SECONDS", "86400"))
+# Cache LRU dos estados guardados (entradas e validade em segundos)
+HMM_STATE_CACHE_SIZE = int(os.getenv("HMM_STATE_CACHE_SIZE", "256"))
+HMM_STATE_CACHE_TTL = float(os.getenv("HMM_STATE_CACHE_TTL", "86400"))
+# Janelas das features usadas pelo modelo (volatility_21 e atr_14)
+VOLATILITY_WINDOW = 21
+ATR_WINDOW = 14
+
+class HmmState(NamedTuple):
+    fit: HmmFit
+    scaler: StandardScaler
+    # Emissões gaussianas pré-computadas: inversas das covariâncias e constantes de normalização
+    precisions: np.ndarray
+    logNorms: np.ndarray
+    logTransmat: np.ndarray
+    # Estado bruto do HMM -> regime ordenado pela volatilidade média
+    mapping: np.ndarray
+    # Log das probabilidades filtradas (forward) na última barra fechada
+    logAlpha: np.ndarray
+    lastTimestamp: pd.Timestamp
+    lastClose: float
+    # Caudas das séries necessárias às janelas móveis das features
+    returnsWindow: np.ndarray
+    trWindow: np.ndarray
+    barsSinceFit: int
+    fittedAt: float
+
+class RegimeUpdate(NamedTuple):
+    timestamp: pd.Timestamp
+    regime: int
+    probabilities: List[float]
+    barsSinceFit: int
+
+_states = ModelCache("hmm_states", HMM_STATE_CACHE_SIZE, HMM_STATE_CACHE_TTL)
+# Serializa a leitura e o avanço de um estado, para que duas requisições não avancem a mesma cópia
+_statesLock = threading.Lock()
+_refitFlight = SingleFlight("hmm_incremental")
+
+class HmmIncremental:
+    @staticmethod
+    def _FitState(closed: pd.DataFrame, n_regimes: int, initFit: Optional[HmmFit] = None) -> Union[HmmState, str]:
+        # Ajuste completo (executado no pool de processos pelo caminho assíncrono)
+        try:
+            result = HiddenMarkovModel._Compute(closed, n_regimes, initFit)
+            if isinstance(result, str):
+                return result
+            regimes_df, fit = result
+
+            features_df = regimes_df[list(HMM_FEATURES)]
+            scaler = StandardScaler().fit(features_df.to_numpy())
+            normalized = scaler.transform(features_df.to_numpy())
+
+            # Mesmo mapeamento estado bruto -> regime do modo completo; estados ausentes do Viterbi ficam por último
+            pairs = regimes_df[['regime_raw', 'regime']].drop_duplicates()
+            mapping = np.empty(n_regimes, dtype=int)
+            mapping[pairs['regime_raw'].to_numpy()] = pairs['regime'].to_numpy()
+            unvisited = np.setdiff1d(np.arange(n_regimes), pairs['regime_raw'].to_numpy())
+            mapping[unvisited] = np.arange(len(pairs), n_regimes)
+
+            precisions = np.linalg.inv(fit.covars)
+            logNorms = -0.5 * (fit.means.shape[1] * np.log(2 * np.pi) + np.linalg.slogdet(fit.covars)[1])
+            with np.errstate(divide='ignore'):
+                logTransmat = np.log(fit.transmat)
+
+            # Filtro forward sobre a janela de ajuste; o último vetor é o ponto de partida das atualizações
+            logEmissions = HmmIncremental._LogEmissions(normalized, fit.means, precisions, logNorms)
+            with np.errstate(divide='ignore'):
+                logAlpha = np.log(fit.startprob) + logEmissions[0]
+            logAlpha -= logsumexp(logAlpha)
+            for logB in logEmissions[1:]:
+                logAlpha = HmmIncremental._Forward(logAlpha, logTransmat, logB)
+
+            closes = closed['Close'].to_numpy(dtype=np.float64)
+            return HmmState(
+                fit=fit,
+                scaler=scaler,
+                precisions=precisions,
+                logNorms=logNorms,
+                logTransmat=logTransmat,
+                mapping=mapping,
+                logAlpha=logAlpha,
+                lastTimestamp=closed.index[-1],
+                lastClose=float(closes[-1]),
+                returnsWindow=(closes[1:] / closes[:-1] - 1)[-VOLATILITY_WINDOW:],
+                trWindow=HmmIncremental._TrueRange(closed)[-ATR_WINDOW:],
+                barsSinceFit=0,
+                fittedAt=time.time(),
+            )
+
+        except Exception as e:
+            logger.error(f"Error fitting incremental HMM state: {e}")
+            return str(e)
+
+    @staticmethod
+    def _TrueRange(df: pd.DataFrame) -> np.ndarray:
+        high = df['High'].to_numpy(dtype=np.float64)
+        low = df['Low'].to_numpy(dtype=np.float64)
+        previousClose = np.r_[np.nan, df['Close'].to_numpy(dtype=np.float64)[:-1]]
+        return np.fmax(high - low, np.fmax(np.abs(high - previousClose), np.abs(low - previousClose)))
+
+    @staticmethod
+    def _LogEmissions(X: np.ndarray, means: np.ndarray, precisions: np.ndarray, logNorms: np.ndarray) -> np.ndarray:
+        # Log-densidade gaussiana de cada observação (linhas de X) em cada estado
+        centered = X[:, None, :] - means[None, :, :]
+        return logNorms[None, :] - 0.5 * np.einsum('nki,kij,nkj->nk', centered, precisions, centered)
+
+    @staticmethod
+    def _Forward(logAlpha: np.ndarray, logTransmat: np.ndarray, logB: np.ndarray) -> np.ndarray:
+        # Um passo do algoritmo forward em log: O(K^2) por observação
+        logAlpha = logsumexp(logAlpha[:, None] + logTransmat, axis=0) + logB
+        return logAlpha - logsumexp(logAlpha)
+
+    @staticmethod
+    def _Step(state: HmmState, bar: pd.Series) -> Tuple[HmmState, np.ndarray]:
+        # Features da nova barra a partir das caudas das janelas móveis, sem recalcular o histórico
+        high, low, close = float(bar['High']), float(bar['Low']), float(bar['Close'])
+        returnsWindow = np.r_[state.returnsWindow, close / state.lastClose - 1][-VOLATILITY_WINDOW:]
+        trueRange = max(high - low, abs(high - state.lastClose), abs(low - state.lastClose))
+        trWindow = np.r_[state.trWindow, trueRange][-ATR_WINDOW:]
+
+        features = np.array([returnsWindow.std(ddof=1), (high - low) / close, trWindow.mean()])
+        x = (features - state.scaler.mean_) / state.scaler.scale_
+        logB = HmmIncremental._LogEmissions(x[None, :], state.fit.means, state.precisions, state.logNorms)[0]
+        logAlpha = HmmIncremental._Forward(state.logAlpha, state.logTransmat, logB)
+        return state._replace(
+            logAlpha=logAlpha,
+            lastClose=close,
+            returnsWindow=returnsWindow,
+            trWindow=trWindow,
+        ), logAlpha
+
+    @staticmethod
+    def _Advance(state: HmmState, bars: pd.DataFrame) -> HmmState:
+        for _, bar in bars.iterrows():
+            state, _ = HmmIncremental._Step(state, bar)
+        return state._replace(lastTimestamp=bars.index[-1], barsSinceFit=state.barsSinceFit + len(bars))
+
+    @staticmethod
+    def _Current(state: HmmState, df: pd.DataFrame) -> RegimeUpdate:
+        # A barra em formação é filtrada de forma provisória, sem alterar o estado guardado
+        _, logAlpha = HmmIncremental._Step(state, df.iloc[-1])
+        raw = np.exp(logAlpha)
+        probabilities = np.zeros_like(raw)
+        probabilities[state.mapping] = raw
+        return RegimeUpdate(
+            timestamp=df.index[-1],
+            regime=int(np.argmax(probabilities)),
+            probabilities=probabilities.tolist(),
+            barsSinceFit=state.barsSinceFit,
+        )
+
+    @staticmethod
+    def _NeedsRefit(state: Optional[HmmState], closed: pd.DataFrame) -> bool:
+        return (state is None
+                or state.barsSinceFit >= HMM_REFIT_BARS
+                or time.time() - state.fittedAt >= HMM_REFIT_SECONDS
+                or state.lastTimestamp not in closed.index)
+
+    @staticmethod
+    def _StateKey(symbolInfos: SymbolProperties, n_regimes: int) -> tuple:
+        # A janela faz parte da chave: janelas diferentes têm ajustes (e últimas barras) diferentes
+        return (symbolInfos.symbol.value, symbolInfos.start_date, symbolInfos.end_date,
+                symbolInfos.granularity.value, n_regimes)
+
+    @staticmethod
+    def _Update(key: tuple, closed: pd.DataFrame) -> Optional[HmmState]:
+        with _statesLock:
+            state = _states.Get(key)
+            if HmmIncremental._NeedsRefit(state, closed):
+                return None
+            new_bars = closed[closed.index > state.lastTimestamp]
+            if not new_bars.empty:
+                state = HmmIncremental._Advance(state, new_bars)
+                _states.Put(key, state)
+            return state
+
+    @staticmethod
+    def _Refit(key: tuple, closed: pd.DataFrame, n_regimes: int) -> Union[HmmState, str]:
+        previous = _states.Get(key)
+        state = HmmIncremental._FitState(closed, n_regimes, previous.fit if previous is not None else None)
+        if isinstance(state, str):
+            return state
+        _states.Put(key, state)
+        logger.info(f"Incremental HMM state refitted for {key} in {state.fit.iterations} iterations.")
+        return state
+
+    @staticmethod
+    async def _RefitAsync(key: tuple, closed: pd.DataFrame, n_regimes: int) -> Union[HmmState, str]:
+        previous = _states.Get(key)
+        state = await RunInProcessPool(HmmIncremental._FitState, closed, n_regimes,
+                                       previous.fit if previous is not None else None)
+        if isinstance(state, str):
+            return state
+        _states.Put(key, state)
+        logger.info(f"Incremental HMM state refitted for {key} in {state.fit.iterations} iterations.")
+        return state
+
+    @staticmethod
+    def _Prepare(symbolInfos: SymbolProperties, n_regimes: int,
+                 df: Union[pd.DataFrame, str]) -> Union[pd.DataFrame, str]:
+        if isinstance(df, str):
+            return df
+        if n_regimes <= 0:
+            return "Number of regimes must be a positive integer."
+        if len(df) < 2:
+            return f"Not enough bars for {symbolInfos.symbol.value} to filter regimes."
+        return df
+
+    @staticmethod
+    def UpdateRegime(symbolInfos: SymbolProperties, n_regimes: int) -> Union[RegimeUpdate, str]:
+        try:
+            df = HmmIncremental._Prepare(symbolInfos, n_regimes, Quotations().Get(symbolInfos))
+            if isinstance(df, str):
+                return df
+
+            # A última barra ainda está em formação: só as barras fechadas entram no estado
+            closed = df.iloc[:-1]
+            key = HmmIncremental._StateKey(symbolInfos, n_regimes)
+            state = HmmIncremental._Update(key, closed)
+            if state is None:
+                state = _refitFlight.Do(key, HmmIncremental._Refit, key, closed, n_regimes)
+                if isinstance(state, str):
+                    return state
+
+            return HmmIncremental._Current(state, df)
+
+        except Exception as e:
+            logger.error(f"Error updating regime for {symbolInfos.symbol}: {e}")
+            return str(e)
+
+    @staticmethod
+    async def UpdateRegimeAsync(symbolInfos: SymbolProperties, n_regimes: int) -> Union[RegimeUpdate, str]:
+        try:
+            df = HmmIncremental._Prepare(symbolInfos, n_regimes, await Quotations().GetAsync(symbolInfos))
+            if isinstance(df, str):
+                return df
+
+            closed = df.iloc[:-1]
+            key = HmmIncremental._StateKey(symbolInfos, n_regimes)
+            state = HmmIncremental._Update(key, closed)
+            if state is None:
+                state = await _refitFlight.DoAsync(key, HmmIncremental._RefitAsync, key, closed, n_regimes)
+                if isinstance(state, str):
+                    return state
+
+            return HmmIncremental._Current(state, df)
+
+        except Exception as e:
+            logger.error(f"Error updating regime for {symbolInfos.symbol}: {e}")
+            return str(e)
@@ -0,0 +1,222 @@
+import os
+import time
+import uuid
+import heapq
+import asyncio
+import itertools
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, Union
+from entities.JobStatus import JobStatus
+from services.Executors import PoolProgress, TrackPoolProgress, UntrackPoolProgress, MODEL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Jobs executados ao mesmo tempo (o trabalho pesado de cada um vai para o pool de processos)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(max(MODEL_WORKERS, 1))))
+# Limite de jobs aguardando na fila; acima dele a submissão é recusada
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "256"))
+# Tempo (segundos) que o resultado de um job concluído fica disponível
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+# Limite de jobs concluídos retidos; acima dele os resultados mais antigos são descartados antes do TTL
+JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", "256"))
+
+class Job:
+    def __init__(self, kind: str, key: Hashable, priority: int, sequence: int,
+                 fn: Callable[..., Awaitable[Any]], args: Tuple[Any, ...]) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.priority = priority
+        self.sequence = sequence
+        self.fn = fn
+        self.args = args
+        self.status = JobStatus.QUEUED
+        self.progress = PoolProgress()
+        self.submittedAt = time.time()
+        self.startedAt: Optional[float] = None
+        self.finishedAt: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    def Order(self) -> Tuple[int, int]:
+        # Maior prioridade primeiro; na mesma prioridade, ordem de chegada
+        return (-self.priority, self.sequence)
+
+class JobQueue:
+    # Todas as instâncias criadas, para expor os contadores em /stats
+    _registry: Dict[str, "JobQueue"] = {}
+
+    def __init__(self, name: str, workers: int, max_queued: int, result_ttl: float, max_retained: int) -> None:
+        self.name = name
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self._lock = threading.Lock()
+        # Heap de (ordem, job); entradas de jobs que já saíram da fila são descartadas ao desempilhar
+        self._heap: List[Tuple[Tuple[int, int], Job]] = []
+        self._jobs: Dict[str, Job] = {}
+        # Jobs concluídos em ordem de término (o mais antigo primeiro), para expiração e limite de retenção
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+        # Jobs na fila ou em execução, por chave da requisição (deduplicação)
+        self._active: Dict[Hashable, Job] = {}
+        self._sequence = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.discarded = 0
+        JobQueue._registry[name] = self
+
+    def _Start(self) -> None:
+        # Os workers são criados no primeiro Submit, dentro do event loop da aplicação
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._Worker(i)) for i in range(self.workers)]
+        logger.info(f"Job queue {self.name} started with {self.workers} workers.")
+
+    async def Stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def _Purge(self) -> None:
+        # Remove os resultados expirados e, acima do limite de retenção, os mais antigos
+        now = time.time()
+        while self._finished:
+            jobId, job = next(iter(self._finished.items()))
+            if now - job.finishedAt <= self.result_ttl and len(self._finished) <= self.max_retained:
+                break
+            del self._finished[jobId]
+            del self._jobs[jobId]
+            self.discarded += 1
+
+    async def Submit(self, kind: str, key: Hashable, priority: int,
+                     fn: Callable[..., Awaitable[Any]], *args) -> Union[Tuple[Job, bool], str]:
+        """
+        Enfileira fn(*args) e devolve (job, deduplicado). Uma requisição idêntica a um job na fila ou em execução
+        devolve o job existente (com a prioridade elevada, se a nova for maior), e portanto o mesmo progresso.
+        """
+        self._Start()
+        with self._lock:
+            self._Purge()
+            job = self._active.get(key)
+            if job is not None:
+                self.deduplicated += 1
+                if job.status == JobStatus.QUEUED and priority > job.priority:
+                    job.priority = priority
+                    heapq.heappush(self._heap, (job.Order(), job))
+                return job, True
+
+            queued = sum(1 for job in self._active.values() if job.status == JobStatus.QUEUED)
+            if queued >= self.max_queued:
+                self.rejected += 1
+                return f"Job queue is full ({self.max_queued} queued jobs)."
+
+            job = Job(kind, key, priority, next(self._sequence), fn, args)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            heapq.heappush(self._heap, (job.Order(), job))
+            self.submitted += 1
+
+        async with self._wakeup:
+            self._wakeup.notify()
+        logger.info(f"Job {job.id} ({kind}) queued with priority {priority}.")
+        return job, False
+
+    def Get(self, jobId: str) -> Optional[Job]:
+        with self._lock:
+            self._Purge()
+            return self._jobs.get(jobId)
+
+    def QueuePosition(self, job: Job) -> Optional[int]:
+        # Jobs à frente na fila (0 = o próximo a executar)
+        with self._lock:
+            if job.status != JobStatus.QUEUED:
+                return None
+            return sum(1 for other in self._active.values()
+                       if other.status == JobStatus.QUEUED and other.Order() < job.Order())
+
+    def _Next(self) -> Optional[Job]:
+        with self._lock:
+            while self._heap:
+                order, job = heapq.heappop(self._heap)
+                # Entradas antigas (prioridade elevada depois) ou de jobs que já saíram da fila
+                if job.status == JobStatus.QUEUED and order == job.Order():
+                    job.status = JobStatus.RUNNING
+                    job.startedAt = time.time()
+                    return job
+            return None
+
+    async def _Worker(self, index: int) -> None:
+        while True:
+            job = self._Next()
+            if job is None:
+                async with self._wakeup:
+                    await self._wakeup.wait_for(lambda: any(
+                        job.status == JobStatus.QUEUED for _, job in self._heap))
+                continue
+            await self._Run(job)
+
+    async def _Run(self, job: Job) -> None:
+        # As tarefas que o job envia ao pool de processos alimentam o seu progresso
+        token = TrackPoolProgress(job.progress)
+        try:
+            result = await job.fn(*job.args)
+            if isinstance(result, str):
+                job.status, job.error = JobStatus.FAILED, result
+            else:
+                job.status, job.result = JobStatus.DONE, result
+
+        except Exception as e:
+            logger.error(f"Error running job {job.id} ({job.kind}): {e}")
+            job.status, job.error = JobStatus.FAILED, str(e)
+
+        finally:
+            UntrackPoolProgress(token)
+            job.finishedAt = time.time()
+            job.fn, job.args = None, ()
+            with self._lock:
+                self._active.pop(job.key, None)
+                self._finished[job.id] = job
+                self._Purge()
+                if job.status == JobStatus.DONE:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            logger.info(f"Job {job.id} ({job.kind}) {job.status} in {job.finishedAt - job.startedAt:.2f}s.")
+
+    def Stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": sum(1 for job in self._active.values() if job.status == JobStatus.QUEUED),
+                "running": sum(1 for job in self._active.values() if job.status == JobStatus.RUNNING),
+                "retained": len(self._finished),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "discarded": self.discarded,
+            }
+
+    @staticmethod
+    async def StopAll() -> None:
+        for queue in JobQueue._registry.values():
+            await queue.Stop()
+
+    @staticmethod
+    def AllStats() -> Dict[str, Dict[str, int]]:
+        return {name: queue.Stats() for name, queue in JobQueue._registry.items()}
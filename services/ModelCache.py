@@ -0,0 +1,69 @@
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ModelCache:
+    # Todas as instâncias criadas, para expor os contadores em /stats
+    _registry: Dict[str, "ModelCache"] = {}
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float, max_bytes: int = 0) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Limite opcional de bytes (0 = só pelo número de entradas); o tamanho de cada entrada é informado no Put
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # LRU: a entrada mais recente fica no fim; valor = (expira_em, objeto, bytes)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        ModelCache._registry[name] = self
+
+    def Get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                    self.bytes -= entry[2]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def Put(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None, size: int = 0) -> None:
+        with self._lock:
+            if self.max_bytes and size > self.max_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+            self._entries[key] = (time.monotonic() + ttl, value, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def Stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    @staticmethod
+    def AllStats() -> Dict[str, Dict[str, int]]:
+        return {name: cache.Stats() for name, cache in ModelCache._registry.items()}
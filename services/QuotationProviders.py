@@ -0,0 +1,107 @@
+import os
+import json
+import threading
+import logging
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from services.Resampler import Resampler, INTRADAY_MINUTES
+
+logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUOTATION_PROVIDER = os.getenv("QUOTATION_PROVIDER", "yfinance")
+REPLAY_DATA_PATH = os.getenv("REPLAY_DATA_PATH", os.path.join(_ROOT, "mock_data", "quotations.replay.npy"))
+
+# Layout binário das barras do replay: uma linha por barra, ordenada por (símbolo, granularidade, timestamp)
+REPLAY_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("Open", "<f8"),
+    ("High", "<f8"),
+    ("Low", "<f8"),
+    ("Close", "<f8"),
+    ("Volume", "<i8"),
+    ("Dividends", "<f8"),
+    ("Stock Splits", "<f8"),
+])
+
+class QuotationProvider(ABC):
+    name: str = ""
+    # Indica se vale a pena manter as barras no BarStore local
+    cacheable: bool = True
+
+    @abstractmethod
+    def History(self, symbol: str, start_date: str, end_date: str, interval: str) -> pd.DataFrame:
+        ...
+
+class YFinanceProvider(QuotationProvider):
+    name = "yfinance"
+    cacheable = True
+
+    def History(self, symbol: str, start_date: str, end_date: str, interval: str) -> pd.DataFrame:
+        ticker = yf.Ticker(symbol)
+        data = ticker.history(start=start_date, end=end_date, interval=interval)
+        return pd.DataFrame(data)
+
+class ReplayProvider(QuotationProvider):
+    name = "replay"
+    cacheable = False
+
+    # Arquivos já mapeados, compartilhados entre instâncias: (barras, índice de partições)
+    _opened: Dict[str, Tuple[np.ndarray, dict]] = {}
+    _openedGuard = threading.Lock()
+
+    def __init__(self, path: str = REPLAY_DATA_PATH) -> None:
+        self.path = path
+        self.bars, self.index = ReplayProvider._Open(path)
+
+    @staticmethod
+    def IndexPath(path: str) -> str:
+        return f"{os.path.splitext(path)[0]}.json"
+
+    @classmethod
+    def _Open(cls, path: str) -> Tuple[np.ndarray, dict]:
+        with cls._openedGuard:
+            if path not in cls._opened:
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"Replay file {path} not found. Run GenerateReplayData.py first.")
+                bars = np.load(path, mmap_mode="r")
+                with open(ReplayProvider.IndexPath(path)) as f:
+                    index = json.load(f)
+                cls._opened[path] = (bars, index)
+                logger.info(f"Replay file {path} mapped with {len(bars)} bars.")
+            return cls._opened[path]
+
+    def History(self, symbol: str, start_date: str, end_date: str, interval: str) -> pd.DataFrame:
+        partition = self.index.get(symbol, {}).get(interval)
+        if partition is None:
+            # Granularidades intradiárias ausentes do arquivo são derivadas das barras mais finas disponíveis.
+            # Diário e semanal não: como no BarStore, as barras intradiárias não reproduzem o fechamento oficial
+            if interval in INTRADAY_MINUTES:
+                for source in Resampler.Sources(interval):
+                    if source in self.index.get(symbol, {}):
+                        return Resampler.Resample(self.History(symbol, start_date, end_date, source), interval)
+            logger.warning(f"No replay bars for {symbol} {interval}.")
+            return pd.DataFrame(columns=[name for name in REPLAY_DTYPE.names if name != "ts"])
+
+        bars = self.bars[partition["start"]:partition["stop"]]
+        tz = partition["tz"]
+        lower = pd.Timestamp(start_date, tz=tz).value
+        upper = pd.Timestamp(end_date, tz=tz).value
+        first, last = np.searchsorted(bars["ts"], [lower, upper], side="left")
+        rows = bars[first:last]
+
+        index = pd.DatetimeIndex(rows["ts"].astype("datetime64[ns]"), name=partition["index_name"])
+        index = index.tz_localize("UTC").tz_convert(tz)
+        return pd.DataFrame({name: rows[name] for name in REPLAY_DTYPE.names if name != "ts"}, index=index)
+
+def GetProvider(name: Optional[str] = None) -> QuotationProvider:
+    name = name or QUOTATION_PROVIDER
+    if name == YFinanceProvider.name:
+        return YFinanceProvider()
+    if name == ReplayProvider.name:
+        return ReplayProvider()
+    raise ValueError(f"Unknown quotation provider: {name}")
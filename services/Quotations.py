@@ -1,17 +1,31 @@
+import os
+import asyncio
 import datetime
-import yfinance as yf
 import pandas as pd
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from entities.Symbols import Symbols
 from entities.Granularity import Granularity
-from typing import Union, Optional
+from typing import Dict, List, Union, Optional
 import logging
 from schemas.symbol_properties import SymbolProperties
+from services.BarStore import BarStore, BAR_STORE_ENABLED
+from services.QuotationProviders import QuotationProvider, GetProvider
+from services.SingleFlight import SingleFlight, PropertiesKey
 
 logger = logging.getLogger(__name__)
 
+QUOTATIONS_MAX_WORKERS = int(os.getenv("QUOTATIONS_MAX_WORKERS", "8"))
+
+_quotationsFlight = SingleFlight("quotations")
+
 class Quotations:
-    def __init__(self) -> None:
+    def __init__(self, provider: Optional[QuotationProvider] = None, barStore: Optional[BarStore] = None) -> None:
         self.symbolsValues = [key for key in Symbols.__members__.keys()]
+        self.provider = provider if provider is not None else GetProvider()
+        if barStore is None and BAR_STORE_ENABLED and self.provider.cacheable:
+            barStore = BarStore()
+        self.barStore = barStore
     
     def _VerifySymbol(self, symbol: str) -> bool:
         return symbol in self.symbolsValues
@@ -23,8 +37,20 @@ class Quotations:
         except ValueError:
             logger.error(f"Date format error: {date} is not in YYYY-MM-DD format.")
             return False
+
+    def _Download(self, symbol: str, start_date: str, end_date: str, interval: str) -> pd.DataFrame:
+        return self.provider.History(symbol, start_date, end_date, interval)
         
     def Get(self, symbol: SymbolProperties) -> Union[pd.DataFrame, str]:
+        # Requisições idênticas simultâneas compartilham o mesmo download
+        key = (self.provider.name, *PropertiesKey(symbol))
+        return _quotationsFlight.Do(key, self._Get, symbol)
+
+    async def GetAsync(self, symbol: SymbolProperties) -> Union[pd.DataFrame, str]:
+        # Download e leitura do BarStore são I/O bloqueante: rodam em thread para não travar o event loop
+        return await asyncio.to_thread(self.Get, symbol)
+
+    def _Get(self, symbol: SymbolProperties) -> Union[pd.DataFrame, str]:
         try:
             if not self._VerifySymbol(symbol.symbol.value):
                 return "No such symbol"
@@ -33,12 +59,46 @@ class Quotations:
                 return "Date format error. Use YYYY-MM-DD."
 
             else:
-                ticker = yf.Ticker(symbol.symbol.value)
-                data = ticker.history(start=symbol.start_date, end=symbol.end_date, interval=symbol.granularity.value)
-                df = pd.DataFrame(data)
+                if self.barStore is None:
+                    df = self._Download(symbol.symbol.value, symbol.start_date, symbol.end_date, symbol.granularity.value)
+                else:
+                    df = self.barStore.Get(
+                        symbol,
+                        lambda start, end: self._Download(symbol.symbol.value, start, end, symbol.granularity.value)
+                    )
+                    if isinstance(df, str):
+                        return df
                 logger.info(f"Successfully retrieved data for {symbol} from {symbol.start_date} to {symbol.end_date}")
                 return df
             
         except Exception as e:
             logger.error(f"Error retrieving data for {symbol} from {symbol.start_date} to {symbol.end_date}: {e}")
-            return str(e)
\ No newline at end of file
+            return str(e)
+
+    @staticmethod
+    def DuplicateSymbols(symbols: List[SymbolProperties]) -> Optional[str]:
+        # Os resultados em lote são indexados pelo símbolo: repeti-lo descartaria uma das entradas
+        counts = Counter(props.symbol.value for props in symbols)
+        duplicates = sorted(symbol for symbol, count in counts.items() if count > 1)
+        if duplicates:
+            return f"Duplicate symbols in batch: {', '.join(duplicates)}."
+        return None
+
+    def GetMany(self, symbols: List[SymbolProperties],
+                max_workers: int = QUOTATIONS_MAX_WORKERS) -> Union[Dict[str, Union[pd.DataFrame, str]], str]:
+        # Cada download é I/O bloqueante, então um pool de threads limitado basta para sobrepor as requisições
+        if not symbols:
+            return {}
+        duplicates = Quotations.DuplicateSymbols(symbols)
+        if duplicates is not None:
+            return duplicates
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+            futures = {props.symbol.value: pool.submit(self.Get, props) for props in symbols}
+        results = {symbol: future.result() for symbol, future in futures.items()}
+        failed = [symbol for symbol, result in results.items() if isinstance(result, str)]
+        logger.info(f"Retrieved {len(results) - len(failed)} of {len(results)} symbols in batch.")
+        return results
+
+    async def GetManyAsync(self, symbols: List[SymbolProperties],
+                           max_workers: int = QUOTATIONS_MAX_WORKERS) -> Union[Dict[str, Union[pd.DataFrame, str]], str]:
+        return await asyncio.to_thread(self.GetMany, symbols, max_workers)
@@ -0,0 +1,124 @@
+import datetime
+import logging
+import numpy as np
+import pandas as pd
+from typing import List
+from entities.Granularity import Granularity
+
+logger = logging.getLogger(__name__)
+
+# Duração das granularidades intradiárias em minutos
+INTRADAY_MINUTES = {
+    Granularity.ONE_MINUTE.value: 1,
+    Granularity.TWO_MINUTES.value: 2,
+    Granularity.FIVE_MINUTES.value: 5,
+    Granularity.FIFTEEN_MINUTES.value: 15,
+    Granularity.THIRTY_MINUTES.value: 30,
+    Granularity.SIXTY_MINUTES.value: 60,
+    Granularity.NINETY_MINUTES.value: 90,
+    Granularity.ONE_HOUR.value: 60,
+}
+RESAMPLE_TARGETS = (
+    Granularity.THIRTY_MINUTES.value,
+    Granularity.SIXTY_MINUTES.value,
+    Granularity.NINETY_MINUTES.value,
+    Granularity.ONE_HOUR.value,
+    Granularity.ONE_DAY.value,
+    Granularity.ONE_WEEK.value,
+)
+
+# As barras intradiárias do yfinance são ancoradas na abertura do pregão (09:30, horário da bolsa)
+SESSION_OPEN_MINUTES = 9 * 60 + 30
+_MINUTE_NS = 60 * 1_000_000_000
+_DAY_NS = 24 * 60 * _MINUTE_NS
+
+# Agregação de cada coluna do yfinance; colunas desconhecidas usam o último valor do intervalo
+_FIRST, _MAX, _MIN, _LAST, _SUM = range(5)
+_AGGREGATIONS = {
+    "Open": _FIRST,
+    "High": _MAX,
+    "Low": _MIN,
+    "Close": _LAST,
+    "Volume": _SUM,
+    "Dividends": _SUM,
+    "Stock Splits": _MAX,
+    "Capital Gains": _SUM,
+}
+
+class Resampler:
+    @staticmethod
+    def CanResample(source: str, target: str) -> bool:
+        if target not in RESAMPLE_TARGETS or source == target:
+            return False
+        if source not in INTRADAY_MINUTES:
+            return source == Granularity.ONE_DAY.value and target == Granularity.ONE_WEEK.value
+        if target not in INTRADAY_MINUTES:
+            return True
+        source_minutes = INTRADAY_MINUTES[source]
+        target_minutes = INTRADAY_MINUTES[target]
+        # Cada barra de destino precisa ser formada por barras de origem inteiras, alinhadas à abertura
+        return (source_minutes < target_minutes
+                and target_minutes % source_minutes == 0
+                and (SESSION_OPEN_MINUTES % target_minutes) % source_minutes == 0)
+
+    @staticmethod
+    def Sources(target: str) -> List[str]:
+        # Da origem mais grossa para a mais fina: menos barras a agregar
+        candidates = [g.value for g in Granularity if Resampler.CanResample(g.value, target)]
+        return sorted(candidates, key=lambda g: INTRADAY_MINUTES.get(g, 24 * 60), reverse=True)
+
+    @staticmethod
+    def AlignRange(target: str, start: datetime.date, end: datetime.date) -> tuple:
+        # Barras semanais só podem ser derivadas de semanas completas (segunda a segunda)
+        if target != Granularity.ONE_WEEK.value:
+            return start, end
+        aligned_start = start + datetime.timedelta(days=(7 - start.weekday()) % 7)
+        aligned_end = end - datetime.timedelta(days=end.weekday())
+        return aligned_start, aligned_end
+
+    @staticmethod
+    def _BinKeys(index: pd.DatetimeIndex, target: str) -> np.ndarray:
+        # Horário local da bolsa (sem fuso) preserva as fronteiras de sessão e de dia mesmo com horário de verão
+        local = index.tz_localize(None) if index.tz is not None else index
+        ns = local.as_unit("ns").asi8
+        if target in INTRADAY_MINUTES:
+            step = INTRADAY_MINUTES[target] * _MINUTE_NS
+            offset = (SESSION_OPEN_MINUTES % INTRADAY_MINUTES[target]) * _MINUTE_NS
+            return (ns - offset) // step * step + offset
+        days = ns // _DAY_NS
+        if target == Granularity.ONE_DAY.value:
+            return days * _DAY_NS
+        # 1970-01-01 foi uma quinta-feira; semanas rotuladas pela segunda-feira, como no yfinance
+        return (days - (days + 3) % 7) * _DAY_NS
+
+    @staticmethod
+    def Resample(df: pd.DataFrame, target: str) -> pd.DataFrame:
+        if df.empty:
+            return df.iloc[0:0]
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+
+        keys = Resampler._BinKeys(df.index, target)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        lasts = np.r_[starts[1:], len(keys)] - 1
+
+        columns = {}
+        for name in df.columns:
+            values = df[name].to_numpy()
+            aggregation = _AGGREGATIONS.get(name, _LAST)
+            if aggregation == _FIRST:
+                columns[name] = values[starts]
+            elif aggregation == _MAX:
+                columns[name] = np.fmax.reduceat(values, starts)
+            elif aggregation == _MIN:
+                columns[name] = np.fmin.reduceat(values, starts)
+            elif aggregation == _SUM:
+                columns[name] = np.add.reduceat(np.nan_to_num(values), starts)
+            else:
+                columns[name] = values[lasts]
+
+        index_name = "Datetime" if target in INTRADAY_MINUTES else "Date"
+        index = pd.DatetimeIndex(keys[starts].astype("datetime64[ns]"), name=index_name)
+        if df.index.tz is not None:
+            index = index.tz_localize(df.index.tz)
+        return pd.DataFrame(columns, index=index)
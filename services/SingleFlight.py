@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from schemas.symbol_properties import SymbolProperties
+from services.Executors import PoolProgress, TrackPoolProgress, CurrentPoolProgress
+
+logger = logging.getLogger(__name__)
+
+def PropertiesKey(symbolInfos: SymbolProperties) -> Tuple[str, str, str, str]:
+    return (
+        symbolInfos.symbol.value,
+        symbolInfos.start_date,
+        symbolInfos.end_date,
+        symbolInfos.granularity.value,
+    )
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    # Todas as instâncias criadas, para expor os contadores em /stats
+    _registry: Dict[str, "SingleFlight"] = {}
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._futures: Dict[Hashable, Tuple[asyncio.Future, PoolProgress]] = {}
+        self.executions = 0
+        self.coalesced = 0
+        SingleFlight._registry[name] = self
+
+    def Do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.info(f"Coalesced {self.name} request for {key}.")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def DoAsync(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        with self._lock:
+            flight = self._futures.get(key)
+            leader = flight is None
+            if leader:
+                # A computação roda em uma tarefa da própria flight: cancelar o líder não a interrompe
+                progress = PoolProgress()
+                task = asyncio.ensure_future(self._Run(key, progress, fn, *args, **kwargs))
+                task.add_done_callback(self._Consume)
+                flight = self._futures[key] = (task, progress)
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        task, progress = flight
+
+        if not leader:
+            logger.info(f"Coalesced {self.name} request for {key}.")
+        # Líder e seguidores (ex.: jobs deduplicados aqui) acompanham as mesmas tarefas do pool
+        current = CurrentPoolProgress()
+        if current is not None:
+            current.Attach(progress)
+        # shield: o cancelamento de quem aguarda (líder ou seguidor) não cancela a computação compartilhada
+        return await asyncio.shield(task)
+
+    async def _Run(self, key: Hashable, progress: PoolProgress, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        # As tarefas enviadas ao pool pela computação contam no progresso da flight
+        TrackPoolProgress(progress)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                del self._futures[key]
+
+    @staticmethod
+    def _Consume(task: asyncio.Task) -> None:
+        # Marca a exceção como consumida caso todos os interessados tenham sido cancelados
+        if not task.cancelled():
+            task.exception()
+
+    def Stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._futures),
+            }
+
+    @staticmethod
+    def AllStats() -> Dict[str, Dict[str, int]]:
+        return {name: flight.Stats() for name, flight in SingleFlight._registry.items()}
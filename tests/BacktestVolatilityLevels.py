@@ -0,0 +1,35 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from entities.Distribution import DistributionType
+from schemas.symbol_properties import SymbolProperties
+from services.GarchBacktest import GarchBacktest
+from entities.Granularity import Granularity
+from entities.ArchModels import ArchModelType
+from entities.Symbols import Symbols
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+# Os ajustes rodam em um pool de processos: a guarda evita reexecutar o script nos workers (Windows)
+if __name__ == "__main__":
+    symbolInfos = SymbolProperties(
+        symbol=Symbols.AAPL,
+        start_date="2023-10-01",
+        end_date="2025-10-31",
+        granularity=Granularity.ONE_DAY
+    )
+
+    result = GarchBacktest.Backtest(symbolInfos, ArchModelType.GARCH, DistributionType.NORMAL,
+                                    levels=3, refitEvery=5)
+    if isinstance(result, str):
+        print(result)
+    else:
+        statistics, summary = result
+        print(summary)
+        print(statistics)
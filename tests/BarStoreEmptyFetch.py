@@ -0,0 +1,58 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import tempfile
+import pandas as pd
+from services.BarStore import BarStore
+from schemas.symbol_properties import SymbolProperties
+from entities.Granularity import Granularity
+from entities.Symbols import Symbols
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+class FlakyProvider:
+    # Devolve um DataFrame vazio nas primeiras chamadas (como o yfinance em um rate limit) e depois as barras
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, start_date: str, end_date: str) -> pd.DataFrame:
+        self.calls += 1
+        if self.calls <= self.failures:
+            return pd.DataFrame()
+        index = pd.bdate_range(start_date, end_date, inclusive="left", tz="America/New_York", name="Date")
+        return pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 100}, index=index)
+
+def properties(start_date: str, end_date: str) -> SymbolProperties:
+    return SymbolProperties(
+        symbol=Symbols.AAPL,
+        start_date=start_date,
+        end_date=end_date,
+        granularity=Granularity.ONE_DAY
+    )
+
+with tempfile.TemporaryDirectory() as root:
+    store = BarStore(root)
+
+    # Falha transitória em dias de pregão: o intervalo não é marcado como coberto e a próxima requisição busca de novo
+    week = properties("2025-10-27", "2025-11-01")
+    provider = FlakyProvider(failures=1)
+    first = store.Get(week, provider)
+    second = store.Get(week, provider)
+    third = store.Get(week, provider)
+    print(f"Empty, then {len(second)} bars, then {len(third)} bars in {provider.calls} provider calls")
+    assert first.empty and len(second) == 5 and len(third) == 5
+    assert provider.calls == 2
+
+    # Fim de semana e feriado (Natal) sem barras não têm pregão: ficam cobertos sem voltar ao provider
+    for closed in (properties("2025-11-01", "2025-11-03"), properties("2025-12-25", "2025-12-26")):
+        provider = FlakyProvider(failures=2)
+        assert store.Get(closed, provider).empty and store.Get(closed, provider).empty
+        print(f"{closed.start_date} to {closed.end_date}: {provider.calls} provider call(s)")
+        assert provider.calls == 1
@@ -0,0 +1,41 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from entities.Distribution import DistributionType
+from schemas.symbol_properties import SymbolProperties
+from services.GarchLevels import GarchLevels
+from services.Quotations import Quotations
+from entities.Granularity import Granularity
+from entities.Symbols import Symbols
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+# Compara o caminho nativo do GARCH(1,1)-normal com o arch_model na mesma série
+symbolInfos = SymbolProperties(
+    symbol=Symbols.AAPL,
+    start_date="2023-01-01",
+    end_date="2025-10-31",
+    granularity=Granularity.ONE_DAY
+)
+
+df = Quotations().Get(symbolInfos)
+returns = df['Close'].pct_change().dropna()
+
+arch_fit = GarchLevels._FitModel(returns, DistributionType.NORMAL, None, vol='GARCH', p=1, q=1)
+native_fit = GarchLevels._NativeGarchModel(returns)
+
+if native_fit is None:
+    print("Native fit did not converge; arch would be used.")
+else:
+    print(arch_fit.params.to_frame("arch").join(native_fit.params.to_frame("native")))
+    print(f"Log-likelihood: arch={arch_fit.loglikelihood:.6f} native={native_fit.loglikelihood:.6f}")
+    relative = np.max(np.abs(native_fit.volatility / arch_fit.volatility - 1))
+    print(f"Max relative volatility difference: {relative:.2e}")
+    assert relative < 1e-3, "Native GARCH diverges from arch"
@@ -0,0 +1,42 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+from services.GarchLevels import GarchLevels
+from entities.DecimationMethod import DecimationMethod
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+# Barras sintéticas de 15m: passeio aleatório no fechamento e volatilidade condicional com agrupamentos
+rng = np.random.default_rng(7)
+bars = 5000
+close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+open_ = np.r_[close[0], close[:-1]]
+df = pd.DataFrame({
+    'Open': open_,
+    'High': np.maximum(open_, close) * (1 + rng.uniform(0, 0.002, bars)),
+    'Low': np.minimum(open_, close) * (1 - rng.uniform(0, 0.002, bars)),
+    'Close': close,
+    'Volume': rng.integers(1_000, 10_000, bars),
+}, index=pd.date_range("2025-01-02 09:30", periods=bars, freq="15min", tz="America/New_York", name="Datetime"))
+volatility = pd.Series(0.002 * np.exp(np.convolve(rng.normal(0, 0.3, bars - 1), np.ones(20) / 20, mode="same") * 5))
+
+multipliers = GarchLevels.LevelMultipliers(levels=3)
+levels_df = GarchLevels._CalculateLevels(df, volatility, multipliers)
+decimated = GarchLevels.DecimateLevels(levels_df, 200, DecimationMethod.MINMAX, multipliers)
+print(f"{len(levels_df)} bars decimated to {len(decimated)}")
+assert len(decimated) <= 200
+
+# A máxima do preço, a mínima do preço e os dois extremos de cada banda sobrevivem à redução
+assert decimated['High'].max() == levels_df['High'].max() and decimated['Low'].min() == levels_df['Low'].min()
+for column in GarchLevels._LevelColumns(multipliers):
+    original, kept = levels_df[column].to_numpy(), decimated[column].to_numpy()
+    print(f"{column}: max {original.max():.4f} -> {kept.max():.4f}, min {original.min():.4f} -> {kept.min():.4f}")
+    assert kept.max() == original.max() and kept.min() == original.min()
@@ -0,0 +1,35 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from services.HiddenMarkovModel import HiddenMarkovModel
+from schemas.symbol_properties import SymbolProperties
+from entities.Granularity import Granularity
+from entities.SelectionCriterion import SelectionCriterion
+from entities.Symbols import Symbols
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+# Os ajustes rodam em um pool de processos: a guarda evita reexecutar o script nos workers (Windows)
+if __name__ == "__main__":
+    symbolInfos = SymbolProperties(
+        symbol=Symbols.AAPL,
+        start_date="2024-01-01",
+        end_date="2025-10-31",
+        granularity=Granularity.ONE_DAY
+    )
+
+    result = HiddenMarkovModel.GetBestRegimes(symbolInfos, min_regimes=2, max_regimes=4, restarts=4,
+                                              criterion=SelectionCriterion.BIC)
+    if isinstance(result, str):
+        print(result)
+    else:
+        regimes, comparison = result
+        print(comparison)
+        print(regimes.attrs["fit"])
+        print(regimes[['Close', 'volatility_21', 'regime']])
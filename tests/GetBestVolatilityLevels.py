@@ -0,0 +1,33 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from schemas.symbol_properties import SymbolProperties
+from services.GarchLevels import GarchLevels
+from entities.Granularity import Granularity
+from entities.SelectionCriterion import SelectionCriterion
+from entities.Symbols import Symbols
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+# Os ajustes rodam em um pool de processos: a guarda evita reexecutar o script nos workers (Windows)
+if __name__ == "__main__":
+    symbolInfos = SymbolProperties(
+        symbol=Symbols.AAPL,
+        start_date="2025-10-01",
+        end_date="2025-10-31",
+        granularity=Granularity.FIFTEEN_MINUTES
+    )
+
+    result = GarchLevels.GetBestLevels(symbolInfos, levels=3, criterion=SelectionCriterion.BIC)
+    if isinstance(result, str):
+        print(result)
+    else:
+        df, comparison = result
+        print(comparison)
+        print(df)
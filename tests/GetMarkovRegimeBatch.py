@@ -0,0 +1,35 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from schemas.symbol_properties import SymbolProperties
+from services.HiddenMarkovModel import HiddenMarkovModel
+from entities.Granularity import Granularity
+from entities.Symbols import Symbols
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+# Os ajustes rodam em um pool de processos: a guarda evita reexecutar o script nos workers (Windows)
+if __name__ == "__main__":
+    symbols = [
+        SymbolProperties(
+            symbol=symbol,
+            start_date="2024-01-01",
+            end_date="2025-10-31",
+            granularity=Granularity.ONE_DAY
+        )
+        for symbol in Symbols
+    ]
+
+    result = HiddenMarkovModel.GetRegimesBatch(symbols, n_regimes=[2, 3, 4])
+    if isinstance(result, str):
+        print(result)
+    else:
+        summary, _, errors = result
+        print(summary[['symbol', 'n_regimes', 'regime', 'regime_bars', 'regime_since', 'loglikelihood']])
+        print(errors)
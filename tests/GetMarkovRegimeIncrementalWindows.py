@@ -0,0 +1,44 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from schemas.symbol_properties import SymbolProperties
+from services.HmmIncremental import HmmIncremental, _refitFlight
+from entities.Granularity import Granularity
+from entities.Symbols import Symbols
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+# Os ajustes rodam em um pool de processos: a guarda evita reexecutar o script nos workers (Windows)
+if __name__ == "__main__":
+    first = SymbolProperties(
+        symbol=Symbols.AAPL,
+        start_date="2024-01-01",
+        end_date="2025-06-30",
+        granularity=Granularity.ONE_DAY
+    )
+    second = SymbolProperties(
+        symbol=Symbols.AAPL,
+        start_date="2024-06-01",
+        end_date="2025-10-31",
+        granularity=Granularity.ONE_DAY
+    )
+
+    # Cada janela ajusta o seu próprio estado; voltar à primeira janela reaproveita o estado dela
+    before = HmmIncremental.UpdateRegime(first, n_regimes=3)
+    other = HmmIncremental.UpdateRegime(second, n_regimes=3)
+    after = HmmIncremental.UpdateRegime(first, n_regimes=3)
+    print(before)
+    print(other)
+    print(after)
+    print(_refitFlight.Stats())
+
+    assert HmmIncremental._StateKey(first, 3) != HmmIncremental._StateKey(second, 3)
+    assert _refitFlight.Stats()["executions"] == 2
+    assert after == before
+    assert other.timestamp != before.timestamp
@@ -0,0 +1,29 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from entities.Granularity import Granularity
+from services.Quotations import Quotations
+from schemas.symbol_properties import SymbolProperties
+from entities.Symbols import Symbols
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+symbols = [
+    SymbolProperties(
+        symbol=symbol,
+        start_date="2025-01-01",
+        end_date="2025-01-31",
+        granularity=Granularity.ONE_DAY
+    )
+    for symbol in Symbols
+]
+
+results = Quotations().GetMany(symbols)
+for symbol, df in results.items():
+    print(symbol, df if isinstance(df, str) else df.shape)
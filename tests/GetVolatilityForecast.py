@@ -0,0 +1,36 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from entities.Distribution import DistributionType
+from schemas.symbol_properties import SymbolProperties
+from services.GarchForecast import GarchForecast
+from entities.Granularity import Granularity
+from entities.ArchModels import ArchModelType
+from entities.Symbols import Symbols
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+# Os ajustes rodam em um pool de processos: a guarda evita reexecutar o script nos workers (Windows)
+if __name__ == "__main__":
+    symbolInfos = SymbolProperties(
+        symbol=Symbols.AAPL,
+        start_date="2025-10-01",
+        end_date="2025-10-31",
+        granularity=Granularity.FIFTEEN_MINUTES
+    )
+
+    for modelType in ArchModelType:
+        result = GarchForecast.Forecast(symbolInfos, modelType, DistributionType.NORMAL,
+                                        horizon=26, levels=2, paths=2000, seed=42)
+        if isinstance(result, str):
+            print(modelType.value, result)
+        else:
+            forecast, details = result
+            print(modelType.value, details)
+            print(forecast)
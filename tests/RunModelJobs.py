@@ -0,0 +1,54 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import asyncio
+from services.JobQueue import JobQueue
+from services.HiddenMarkovModel import HiddenMarkovModel
+from services.GarchLevels import GarchLevels
+from services.Executors import ShutdownProcessPool
+from schemas.symbol_properties import SymbolProperties
+from entities.Granularity import Granularity
+from entities.SelectionCriterion import SelectionCriterion
+from entities.JobStatus import JobStatus
+from entities.Symbols import Symbols
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+async def main():
+    symbolInfos = SymbolProperties(
+        symbol=Symbols.AAPL,
+        start_date="2024-01-01",
+        end_date="2025-10-31",
+        granularity=Granularity.ONE_DAY
+    )
+    queue = JobQueue("test_jobs", workers=1, max_queued=8, result_ttl=60, max_retained=8)
+
+    # O segundo job tem prioridade maior e roda antes do terceiro; o quarto é idêntico ao primeiro (deduplicado)
+    best, _ = await queue.Submit("markov_regimes_best", "best", 0, HiddenMarkovModel.GetBestRegimesAsync,
+                                 symbolInfos, 2, 4, 2, SelectionCriterion.BIC)
+    garch, _ = await queue.Submit("garch_levels_best", "garch", 1, GarchLevels.GetBestLevelsAsync, symbolInfos, 2)
+    regimes, _ = await queue.Submit("markov_regimes", "regimes", 0, HiddenMarkovModel.GetRegimesAsync, symbolInfos, 3)
+    duplicate, deduplicated = await queue.Submit("markov_regimes_best", "best", 0, HiddenMarkovModel.GetBestRegimesAsync,
+                                                 symbolInfos, 2, 4, 2, SelectionCriterion.BIC)
+    print(f"Duplicate of {best.id}: {duplicate.id == best.id and deduplicated}")
+
+    jobs = [best, garch, regimes]
+    while any(job.status in (JobStatus.QUEUED, JobStatus.RUNNING) for job in jobs):
+        print(" | ".join(f"{job.kind}: {job.status} {job.progress.Fraction():.0%}" for job in jobs))
+        await asyncio.sleep(1)
+
+    for job in jobs:
+        print(f"{job.kind}: {job.status} em {job.finishedAt - job.startedAt:.2f}s {job.error or ''}")
+    print(queue.Stats())
+    await queue.Stop()
+
+# Os ajustes rodam em um pool de processos: a guarda evita reexecutar o script nos workers (Windows)
+if __name__ == "__main__":
+    asyncio.run(main())
+    ShutdownProcessPool()
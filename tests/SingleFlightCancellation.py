@@ -0,0 +1,42 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import asyncio
+from services.SingleFlight import SingleFlight
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+async def compute(value: int) -> int:
+    await asyncio.sleep(0.2)
+    return value * 2
+
+async def main():
+    flight = SingleFlight("test_cancellation")
+
+    # O líder é cancelado (ex.: cliente desconectou) enquanto um seguidor aguarda a mesma chave
+    leader = asyncio.create_task(flight.DoAsync("key", compute, 21))
+    await asyncio.sleep(0.05)
+    follower = asyncio.create_task(flight.DoAsync("key", compute, 21))
+    await asyncio.sleep(0.05)
+    leader.cancel()
+
+    result = await follower
+    print(f"Leader cancelled: {leader.cancelled()} | follower result: {result}")
+    assert leader.cancelled() and result == 42
+
+    # Com todos cancelados a computação termina sozinha e a chave é liberada
+    orphan = asyncio.create_task(flight.DoAsync("orphan", compute, 1))
+    await asyncio.sleep(0.05)
+    orphan.cancel()
+    await asyncio.sleep(0.3)
+    print(flight.Stats())
+    assert flight.Stats() == {"executions": 2, "coalesced": 1, "in_flight": 0}
+
+if __name__ == "__main__":
+    asyncio.run(main())
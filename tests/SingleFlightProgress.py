@@ -0,0 +1,49 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import time
+import asyncio
+from services.SingleFlight import SingleFlight
+from services.Executors import PoolProgress, RunInProcessPool, TrackPoolProgress, ShutdownProcessPool
+import logging
+
+logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s'
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+async def compute(tasks: int) -> int:
+    # Tarefas sequenciais no pool, como os candidatos de um ajuste
+    for _ in range(tasks):
+        await RunInProcessPool(time.sleep, 0.1)
+    return tasks
+
+async def run(flight: SingleFlight, progress: PoolProgress) -> int:
+    # Cada requisição (ex.: um job) acompanha o próprio contador de progresso
+    TrackPoolProgress(progress)
+    return await flight.DoAsync("key", compute, 4)
+
+async def main():
+    flight = SingleFlight("test_progress")
+    leader, follower = PoolProgress(), PoolProgress()
+
+    # O seguidor entra na flight já em andamento e passa a ver as mesmas tarefas do pool que o líder
+    first = asyncio.create_task(run(flight, leader))
+    await asyncio.sleep(0.15)
+    second = asyncio.create_task(run(flight, follower))
+    await asyncio.sleep(0.1)
+    print(f"Running: leader {leader.Fraction():.0%}, follower {follower.Fraction():.0%}")
+    assert follower.submitted > 0 and follower.completed > 0
+    assert (follower.submitted, follower.completed) == (leader.submitted, leader.completed)
+
+    await asyncio.gather(first, second)
+    print(f"Done: leader {leader.Fraction():.0%}, follower {follower.Fraction():.0%}")
+    assert leader.Fraction() == follower.Fraction() == 1.0
+    assert flight.Stats() == {"executions": 1, "coalesced": 1, "in_flight": 0}
+
+# O pool de processos exige a guarda para não reexecutar o script nos workers (Windows)
+if __name__ == "__main__":
+    asyncio.run(main())
+    ShutdownProcessPool()